@@ -0,0 +1,136 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.middleware.query_budget import record_queries
+from posts.cache import AUTHOR_GENERATION, GROUP_GENERATION
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    """JSON API лент и поста."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        ])
+        cls.post = Post.objects.first()
+        cls.feed_urls = [
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('api:profile', kwargs={'username': cls.author.username}),
+        ]
+
+    def test_feeds_are_cursor_paginated(self):
+        """Ленты отдают страницы и курсоры для следующей страницы."""
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).json()
+                self.assertEqual(
+                    len(first_page['results']), settings.POSTS_PER_PAGE
+                )
+                self.assertIsNone(first_page['previous'])
+                second_page = self.client.get(
+                    url, {'after': first_page['next']}
+                ).json()
+                self.assertEqual(len(second_page['results']), 3)
+                self.assertIsNone(second_page['next'])
+
+    def test_post_detail(self):
+        """Пост отдается компактным словарем."""
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.json(), {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': response.json()['pub_date'],
+            'author': self.author.username,
+            'group': self.group.slug,
+        })
+
+    def test_unknown_objects_return_404(self):
+        """Несуществующие группа, автор и пост дают 404."""
+        urls = [
+            reverse('api:group_list', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_unknown_feeds_have_no_etag(self):
+        """404 ленты несуществующей группы или автора без ETag, и для
+        них не заводятся поколения в кэше."""
+        cache.clear()
+        urls = [
+            reverse('api:group_list', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertFalse(response.has_header('ETag'))
+        self.assertIsNone(cache.get(GROUP_GENERATION.format('missing')))
+        self.assertIsNone(cache.get(AUTHOR_GENERATION.format('missing')))
+
+    def test_unchanged_resources_return_304(self):
+        """С совпавшим If-None-Match ответ 304 почти без запросов к БД."""
+        urls = self.feed_urls + [
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertFalse(etag.startswith('W/'))
+                with record_queries() as queries:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+                self.assertLessEqual(len(queries), 1)
+
+    def test_etag_changes_after_post_edit(self):
+        """После изменения поста ETag ленты и поста меняется."""
+        urls = self.feed_urls + [
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_etag_changes_after_rename(self):
+        """Смена имени автора и адреса группы меняет ETag поста."""
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        User.objects.filter(pk=self.author.pk).update(username='renamed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['author'], 'renamed')
+        etag = response['ETag']
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed-slug')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['group'], 'renamed-slug')
@@ -0,0 +1,122 @@
+import hashlib
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from posts.cache import (feed_version, group_generations, index_generations,
+                         profile_generations)
+from posts.models import Group, Post, User
+from posts.utils import KeysetPaginator, encode_token
+from yatube.settings import POSTS_PER_PAGE
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+
+
+def serialize_post(row):
+    return {name: row[column] for name, column in POST_FIELDS.items()}
+
+
+def post_values(posts):
+    return posts.values(*POST_FIELDS.values())
+
+
+class ValuesKeysetPaginator(KeysetPaginator):
+    """Keyset-пагинация по словарям из .values() без создания моделей."""
+
+    @staticmethod
+    def encode_cursor(row):
+        return encode_token(row['pub_date'].isoformat(), row['id'])
+
+
+def feed_response(request, posts):
+    page = ValuesKeysetPaginator(
+        post_values(posts), POSTS_PER_PAGE
+    ).get_keyset_page(request.GET.get('after'), request.GET.get('before'))
+    return JsonResponse({
+        'results': [serialize_post(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def lookup_pk(request, model, **filters):
+    """pk объекта или None. Результат запоминается на время запроса:
+    его берут и ETag, и само представление."""
+    found = request.__dict__.setdefault('_api_lookups', {})
+    key = (model, *filters.items())
+    if key not in found:
+        found[key] = model.objects.filter(**filters).values_list(
+            'pk', flat=True
+        ).first()
+    return found[key]
+
+
+def group_pk(request, slug):
+    return lookup_pk(request, Group, slug=slug)
+
+
+def author_pk(request, username):
+    return lookup_pk(request, User, username=username)
+
+
+def feed_etag(generation_keys, lookup=None):
+    """Для несуществующей группы или автора ETag нет: иначе 404 получил
+    бы ETag, а в кэше появилось бы поколение для каждого адреса."""
+    def etag_func(request, *args, **kwargs):
+        if lookup is not None and lookup(request, *args, **kwargs) is None:
+            return None
+        return feed_version(request, generation_keys(*args, **kwargs))
+    return etag_func
+
+
+def post_etag(request, post_id):
+    # В ответе есть имя автора и адрес группы: их смена не меняет updated
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated', POST_FIELDS['author'], POST_FIELDS['group']
+    ).first()
+    if row is None:
+        return None
+    updated, username, slug = row
+    raw = f'{post_id}:{updated.timestamp()}:{username}:{slug}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+@require_safe
+@condition(etag_func=feed_etag(index_generations))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@condition(etag_func=feed_etag(group_generations, group_pk))
+def group_posts(request, slug):
+    group_id = group_pk(request, slug)
+    if group_id is None:
+        raise Http404
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+@condition(etag_func=feed_etag(profile_generations, author_pk))
+def profile(request, username):
+    author_id = author_pk(request, username)
+    if author_id is None:
+        raise Http404
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+@condition(etag_func=post_etag)
+def post_detail(request, post_id):
+    row = post_values(Post.objects.filter(pk=post_id)).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(
+        serialize_post(row), json_dumps_params={'ensure_ascii': False}
+    )
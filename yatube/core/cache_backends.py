@@ -0,0 +1,41 @@
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .instrumentation import record_cache
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи get и get_many в RequestStats."""
+
+    _in_get_many = False
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            if not self._in_get_many:
+                record_cache(hits=0, misses=1)
+            return default
+        if not self._in_get_many:
+            record_cache(hits=1, misses=0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Базовый get_many вызывает get для каждого ключа
+        self._in_get_many = True
+        try:
+            values = super().get_many(keys, version)
+        finally:
+            self._in_get_many = False
+        record_cache(len(values), len(keys) - len(values))
+        return values
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    pass
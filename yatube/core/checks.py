@@ -0,0 +1,20 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш лент в памяти процесса не виден другим процессам сервера."""
+    if not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Warning(
+        'Кэш default хранится в памяти процесса.',
+        hint=(
+            'Поколения лент и закэшированные страницы не общие для '
+            'процессов сервера: после записи другой процесс отдаст старую '
+            'страницу. Используйте общий кэш (файловый, БД, memcached, '
+            'Redis) или запускайте сервер одним процессом.'
+        ),
+        id='core.W001',
+    )]
@@ -0,0 +1,61 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connections,
+                       transaction)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    # Сырое соединение: настройка не попадает в execute_wrapper и бюджеты
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(error):
+    return any(message in str(error) for message in LOCKED_MESSAGES)
+
+
+def backoff_delays(attempts, delay, max_delay):
+    """Экспоненциальные паузы со случайным разбросом между попытками."""
+    for attempt in range(attempts - 1):
+        yield random.uniform(0, min(delay * 2 ** attempt, max_delay))
+
+
+def retrying_atomic(func=None, using=DEFAULT_DB_ALIAS):
+    """Выполняет func в транзакции и повторяет её, пока база занята.
+
+    SQLite не ждет busy_timeout, если читающая транзакция пытается стать
+    пишущей, поэтому такие транзакции начинаются заново целиком.
+    Внутри внешней транзакции повтор невозможен, ошибка пробрасывается.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            delays = backoff_delays(
+                settings.DB_WRITE_RETRY_ATTEMPTS,
+                settings.DB_WRITE_RETRY_DELAY,
+                settings.DB_WRITE_RETRY_MAX_DELAY,
+            )
+            while True:
+                try:
+                    with transaction.atomic(using=using):
+                        return func(*args, **kwargs)
+                except OperationalError as error:
+                    if (not is_locked_error(error)
+                            or connections[using].in_atomic_block):
+                        raise
+                    delay = next(delays, None)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        return wrapper
+    if func is None:
+        return decorator
+    return decorator(func)
@@ -0,0 +1,89 @@
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Время и счетчики одного запроса: SQL, шаблоны, кэш."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'queries': self.queries,
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current_stats():
+    return _stats.get()
+
+
+def record_cache(hits, misses):
+    stats = _stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def record_template():
+    """Считает время только внешнего рендера: вложенные в него шаблоны
+    (карточки постов, include) уже входят в это время."""
+    stats = _stats.get()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+def time_query(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+@contextmanager
+def collect_request_stats():
+    """Собирает RequestStats для всего, что выполняется внутри блока."""
+    stats = RequestStats()
+    token = _stats.set(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            yield stats
+    finally:
+        _stats.reset(token)
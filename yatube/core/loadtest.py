@@ -0,0 +1,122 @@
+import http.client
+import logging
+import math
+import multiprocessing
+import time
+from importlib import import_module
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.urls import reverse
+
+# Именованные адреса этих модулей входят в нагрузку
+LOAD_URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+
+# Выход из аккаунта завершил бы сессию авторизованного клиента
+ANONYMOUS_ONLY = frozenset({'users:logout'})
+
+
+def url_patterns():
+    """Имена представлений и параметры их адресов."""
+    for module_name in LOAD_URLCONFS:
+        module = import_module(module_name)
+        for pattern in module.urlpatterns:
+            if pattern.name:
+                yield (
+                    f'{module.app_name}:{pattern.name}',
+                    tuple(pattern.pattern.converters),
+                )
+
+
+def build_targets(values, anonymous_only=ANONYMOUS_ONLY):
+    """Адреса для каждого представления по значениям параметров.
+
+    values — словарь {параметр: список значений}; представления, для
+    которых значений нет, пропускаются.
+    """
+    targets = {}
+    for view_name, params in url_patterns():
+        if not all(values.get(param) for param in params):
+            continue
+        count = max([len(values[param]) for param in params], default=1)
+        targets[view_name] = [
+            reverse(view_name, kwargs={
+                param: values[param][number % len(values[param])]
+                for param in params
+            })
+            for number in range(count)
+        ]
+    return targets
+
+
+def percentile(values, fraction):
+    """Процентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def summarize(samples, duration):
+    """Сводка по представлениям: samples — (имя, статус, секунды)."""
+    views = {}
+    for view_name, status, seconds in samples:
+        views.setdefault(view_name, []).append((status, seconds))
+    report = {}
+    for view_name, results in sorted(views.items()):
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        statuses = {}
+        for status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[view_name] = {
+            'requests': len(results),
+            'throughput': round(len(results) / duration, 2),
+            'statuses': dict(sorted(statuses.items())),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+    return report
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def serve(port_pipe):
+    """Запускает yatube.wsgi на свободном порту и сообщает порт."""
+    from yatube.wsgi import application
+    # Ожидаемые 403 и 404 не засоряют вывод, ошибки 500 видны
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    server = make_server(
+        '127.0.0.1', 0, application,
+        server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+    )
+    port_pipe.send(server.server_port)
+    server.serve_forever()
+
+
+def start_server():
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(child,))
+    process.daemon = True
+    process.start()
+    return process, parent.recv()
+
+
+def fetch(host, port, path, cookie=None):
+    """GET без перехода по редиректам, возвращает статус и секунды."""
+    headers = {'Cookie': cookie} if cookie else {}
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    started = time.perf_counter()
+    try:
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        connection.close()
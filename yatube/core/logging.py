@@ -0,0 +1,21 @@
+import json
+import logging
+
+# Поля, которые JsonFormatter переносит из extra записи лога
+EXTRA_FIELDS = ('view_name', 'status', 'timings', 'query')
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись лога — одна строка JSON."""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                payload[field] = getattr(record, field)
+        return json.dumps(payload, ensure_ascii=False, default=str)
@@ -0,0 +1,22 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .outbox import enqueue
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Не отправляет письма, а ставит их в очередь OutboxMessage.
+    Доставляет их команда send_outbox через OUTBOX_DELIVERY_BACKEND."""
+
+    def send_messages(self, email_messages):
+        messages = [
+            message for message in email_messages if message.recipients()
+        ]
+        if not messages:
+            return 0
+        try:
+            enqueue(messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(messages)
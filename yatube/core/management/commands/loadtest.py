@@ -0,0 +1,153 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, login
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.http import HttpRequest
+
+from core.loadtest import (ANONYMOUS_ONLY, build_targets, fetch,
+                           start_server, summarize)
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# Сколько разных значений каждого параметра адреса участвует в нагрузке
+SAMPLE_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон по всем именованным адресам posts, users и '
+        'about. Печатает JSON с пропускной способностью и p50/p95/p99 '
+        'задержки по представлениям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--anonymous-share', type=float, default=0.7,
+            help='Доля запросов без авторизации'
+        )
+        parser.add_argument(
+            '--weights',
+            help='JSON-файл {"posts:index": 10, ...}, по умолчанию 1'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--username', default='loadtest',
+            help='Пользователь для авторизованных запросов'
+        )
+        parser.add_argument(
+            '--url',
+            help='Уже запущенный сервер, иначе yatube.wsgi запускается здесь'
+        )
+        parser.add_argument('--output', default='-')
+
+    def handle(self, *args, **options):
+        targets = build_targets(self.collect_values())
+        weights = self.load_weights(options['weights'], targets)
+        plan = self.build_plan(targets, weights, options)
+        cookie = self.login_cookie(options['username'])
+        # Соединения не должны достаться процессу сервера
+        connections.close_all()
+        if options['url']:
+            address = urlsplit(options['url'])
+            host, port = address.hostname, address.port or 80
+            server = None
+        else:
+            server, port = start_server()
+            host = '127.0.0.1'
+
+        def run(item):
+            view_name, path, logged_in = item
+            status, seconds = fetch(
+                host, port, path, cookie if logged_in else None
+            )
+            return view_name, status, seconds
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                samples = list(executor.map(run, plan))
+        finally:
+            if server is not None:
+                server.terminate()
+        duration = time.perf_counter() - started
+        report = {
+            'requests': len(samples),
+            'concurrency': options['concurrency'],
+            'anonymous_share': options['anonymous_share'],
+            'seed': options['seed'],
+            'duration_s': round(duration, 3),
+            'throughput': round(len(samples) / duration, 2),
+            'views': summarize(samples, duration),
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+
+    def collect_values(self):
+        return {
+            'slug': list(Group.objects.order_by('pk').values_list(
+                'slug', flat=True
+            )[:SAMPLE_SIZE]),
+            'username': list(User.objects.order_by('pk').values_list(
+                'username', flat=True
+            )[:SAMPLE_SIZE]),
+            'post_id': list(Post.objects.order_by('pk').values_list(
+                'pk', flat=True
+            )[:SAMPLE_SIZE]),
+            'uidb64': ['invalid'],
+            'token': ['invalid-token'],
+        }
+
+    def load_weights(self, path, targets):
+        weights = dict.fromkeys(targets, 1)
+        if path:
+            with open(path) as file:
+                custom = json.load(file)
+            unknown = set(custom) - set(targets)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные представления: {", ".join(sorted(unknown))}'
+                )
+            weights.update(custom)
+        return {name: weight for name, weight in weights.items() if weight}
+
+    def build_plan(self, targets, weights, options):
+        """Последовательность запросов зависит только от --seed."""
+        generator = random.Random(options['seed'])
+        names = list(weights)
+        plan = []
+        for view_name in generator.choices(
+            names, [weights[name] for name in names], k=options['requests']
+        ):
+            path = generator.choice(targets[view_name])
+            logged_in = (
+                view_name not in ANONYMOUS_ONLY
+                and generator.random() >= options['anonymous_share']
+            )
+            plan.append((view_name, path, logged_in))
+        return plan
+
+    def login_cookie(self, username):
+        user, created = User.objects.get_or_create(username=username)
+        if created:
+            user.set_unusable_password()
+            user.save()
+        request = HttpRequest()
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore()
+        login(request, user, 'django.contrib.auth.backends.ModelBackend')
+        request.session.save()
+        return f'{settings.SESSION_COOKIE_NAME}={request.session.session_key}'
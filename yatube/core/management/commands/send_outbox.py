@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.outbox import claim_due, deliver, purge_sent
+
+
+class Command(BaseCommand):
+    help = (
+        'Доставляет письма из очереди пачками через одно соединение '
+        'OUTBOX_DELIVERY_BACKEND. Недоставленные письма повторяются '
+        'с растущей паузой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ждать новых писем'
+        )
+        parser.add_argument('--interval', type=float)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.OUTBOX_BATCH_SIZE
+        interval = options['interval'] or settings.OUTBOX_POLL_INTERVAL
+        connection = get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+        opened = False
+        claimed = sent = purged = 0
+        try:
+            while True:
+                messages = claim_due(batch_size)
+                if not messages:
+                    # Простаивающее соединение сервер может оборвать
+                    if opened:
+                        connection.close()
+                        opened = False
+                    # С --loop цикл не кончается, чистка идет при простое
+                    purged += purge_sent()
+                    if not options['loop']:
+                        break
+                    time.sleep(interval)
+                    continue
+                if not opened:
+                    connection.open()
+                    opened = True
+                delivered = deliver(messages, connection)
+                claimed += len(messages)
+                sent += delivered
+                self.stdout.write(
+                    f'Пачка из {len(messages)} писем: доставлено {delivered}'
+                )
+        finally:
+            if opened:
+                connection.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Доставлено писем: {sent} из {claimed}, '
+            f'удалено старых: {purged}'
+        ))
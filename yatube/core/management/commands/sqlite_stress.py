@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import backoff_delays, is_locked_error
+
+SCHEMA = (
+    'CREATE TABLE stats (id INTEGER PRIMARY KEY, posts_count INTEGER)',
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+    'pub_date REAL, author_id INTEGER)',
+    'CREATE INDEX post_author_pub_date ON post (author_id, pub_date)',
+)
+
+AUTHORS = 100
+
+FEED_SQL = (
+    'SELECT id, text, pub_date FROM post WHERE author_id = ? '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+
+
+def connect(path, pragmas):
+    # Как в Django: автокоммит, транзакции открываются явным BEGIN
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+    return db
+
+
+def create_database(path, pragmas, rows):
+    db = connect(path, pragmas)
+    for sql in SCHEMA:
+        db.execute(sql)
+    db.execute('BEGIN')
+    db.executemany(
+        'INSERT INTO post (text, pub_date, author_id) VALUES (?, ?, ?)',
+        ((f'Пост {number}', number, number % AUTHORS)
+         for number in range(rows)),
+    )
+    db.executemany(
+        'INSERT INTO stats VALUES (?, ?)',
+        ((author, rows // AUTHORS) for author in range(AUTHORS)),
+    )
+    db.execute('COMMIT')
+    db.close()
+
+
+def write_post(db, author):
+    """Та же последовательность, что у post_create: чтение, затем запись."""
+    db.execute('BEGIN')
+    try:
+        db.execute(
+            'SELECT posts_count FROM stats WHERE id = ?', [author]
+        ).fetchone()
+        db.execute(
+            'INSERT INTO post (text, pub_date, author_id) VALUES (?, ?, ?)',
+            ['Новый пост', time.time(), author],
+        )
+        db.execute(
+            'UPDATE stats SET posts_count = posts_count + 1 WHERE id = ?',
+            [author],
+        )
+        db.execute('COMMIT')
+    except sqlite3.Error:
+        db.execute('ROLLBACK')
+        raise
+
+
+def writer(path, pragmas, attempts, deadline, results):
+    db = connect(path, pragmas)
+    done = failed = 0
+    while time.monotonic() < deadline:
+        delays = backoff_delays(
+            attempts,
+            settings.DB_WRITE_RETRY_DELAY,
+            settings.DB_WRITE_RETRY_MAX_DELAY,
+        )
+        while True:
+            try:
+                write_post(db, random.randrange(AUTHORS))
+                done += 1
+                break
+            except sqlite3.OperationalError as error:
+                delay = next(delays, None)
+                if not is_locked_error(error) or delay is None:
+                    failed += 1
+                    break
+                time.sleep(delay)
+    results.put(('writer', done, failed))
+
+
+def reader(path, pragmas, attempts, deadline, results):
+    db = connect(path, pragmas)
+    done = failed = 0
+    while time.monotonic() < deadline:
+        try:
+            db.execute(FEED_SQL, [random.randrange(AUTHORS)]).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            failed += 1
+    results.put(('reader', done, failed))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест SQLite в несколько процессов: пропускная '
+        'способность читателей и писателей с настройками по умолчанию '
+        'и с SQLITE_PRAGMAS и повторами записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        modes = (
+            ('по умолчанию', {}, 1),
+            ('настроенный', settings.SQLITE_PRAGMAS,
+             settings.DB_WRITE_RETRY_ATTEMPTS),
+        )
+        for name, pragmas, attempts in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'stress.sqlite3')
+                create_database(path, pragmas, options['rows'])
+                totals = self.run_workers(path, pragmas, attempts, options)
+            duration = options['duration']
+            self.stdout.write(
+                f'{name}: '
+                f'чтений {totals["reader"][0] / duration:.0f}/с, '
+                f'записей {totals["writer"][0] / duration:.0f}/с, '
+                f'ошибок чтения {totals["reader"][1]}, '
+                f'ошибок записи {totals["writer"][1]}'
+            )
+
+    def run_workers(self, path, pragmas, attempts, options):
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            multiprocessing.Process(
+                target=target,
+                args=(path, pragmas, attempts, deadline, results),
+            )
+            for target, count in (
+                (reader, options['readers']),
+                (writer, options['writers']),
+            )
+            for _ in range(count)
+        ]
+        for worker in workers:
+            worker.start()
+        totals = {'reader': [0, 0], 'writer': [0, 0]}
+        for _ in workers:
+            kind, done, failed = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += failed
+        for worker in workers:
+            worker.join()
+        return totals
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from glob import glob
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Имя: (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'yatube_http_requests_total': (
+        'counter', 'Запросы по представлению, методу и статусу', None,
+    ),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса', LATENCY_BUCKETS,
+    ),
+    'yatube_http_response_size_bytes': (
+        'histogram', 'Размер тела ответа', SIZE_BUCKETS,
+    ),
+    'yatube_db_queries': (
+        'histogram', 'SQL-запросов на один запрос к сайту', QUERY_BUCKETS,
+    ),
+    'yatube_db_query_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов', None,
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кэшу: hit или miss', None,
+    ),
+}
+
+
+def metric_key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+class MetricsRegistry:
+    """Метрики одного процесса.
+
+    Процесс накапливает значения в памяти и раз в METRICS_FLUSH_INTERVAL
+    секунд пишет их в свой файл в METRICS_DIR. Эндпоинт /metrics
+    суммирует файлы всех процессов, общей памяти и сервисов не нужно.
+    """
+
+    def __init__(self, directory):
+        self.pid = os.getpid()
+        # Файл завершившегося процесса остается: счетчики не убывают,
+        # а новый процесс с тем же pid пишет в свой файл
+        self.path = os.path.join(
+            directory, f'{self.pid}-{uuid.uuid4().hex}.json'
+        )
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = metric_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Корзины, затем сумма и число наблюдений
+                histogram = self.histograms[key] = [0] * (len(buckets) + 3)
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {
+                    key: list(values)
+                    for key, values in self.histograms.items()
+                },
+            }
+
+    def flush(self, force=False):
+        # Потоки процесса пишут через один временный файл, поэтому запись
+        # идет под своей блокировкой. Пока файл пишет другой поток,
+        # плановая запись пропускается и запрос не ждет.
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            interval = settings.METRICS_FLUSH_INTERVAL
+            if not force and now - self.flushed < interval:
+                return
+            self.flushed = now
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump(self.snapshot(), file, ensure_ascii=False)
+            os.replace(temporary, self.path)
+        finally:
+            self.flush_lock.release()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Реестр текущего процесса; после fork у потомка создается свой."""
+    global _registry
+    registry = _registry
+    if registry is None or registry.pid != os.getpid():
+        with _registry_lock:
+            if _registry is None or _registry.pid != os.getpid():
+                _registry = MetricsRegistry(settings.METRICS_DIR)
+            registry = _registry
+    return registry
+
+
+def collect(directory):
+    """Сумма метрик всех процессов по их файлам."""
+    counters = {}
+    histograms = {}
+    for path in glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for key, value in data['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, values in data['histograms'].items():
+            total = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+    return counters, histograms
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render(counters, histograms):
+    """Текстовый формат Prometheus 0.0.4."""
+    series = {}
+    for key, value in counters.items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((labels, value))
+    for key, values in histograms.items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((labels, values))
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series.get(name, ()), key=str):
+            if kind != 'histogram':
+                lines.append(f'{name}{format_labels(labels)} '
+                             f'{format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), value):
+                cumulative += count
+                bucket_labels = format_labels([*labels, ('le', str(bound))])
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} '
+                         f'{format_value(value[-2])}')
+            lines.append(f'{name}_count{format_labels(labels)} '
+                         f'{value[-1]}')
+    lines += cache_ratio_lines(counters)
+    return '\n'.join(lines) + '\n'
+
+
+def cache_ratio_lines(counters):
+    results = {'hit': 0, 'miss': 0}
+    for key, value in counters.items():
+        name, labels = json.loads(key)
+        if name == 'yatube_cache_requests_total':
+            results[dict(labels)['result']] += value
+    total = results['hit'] + results['miss']
+    ratio = results['hit'] / total if total else 0
+    return [
+        '# HELP yatube_cache_hit_ratio Доля попаданий в кэш',
+        '# TYPE yatube_cache_hit_ratio gauge',
+        f'yatube_cache_hit_ratio {format_value(float(ratio))}',
+    ]
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.instrumentation import collect_request_stats, current_stats
+from core.metrics import get_registry
+
+
+class MetricsMiddleware:
+    """Записывает показатели запроса в реестр метрик процесса.
+
+    Стоит после ServerTimingMiddleware, чтобы пользоваться ее
+    RequestStats; без нее собирает свою.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = current_stats()
+        if stats is None:
+            with collect_request_stats() as stats:
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        self.record(request, response, stats)
+        return response
+
+    def record(self, request, response, stats):
+        match = request.resolver_match
+        view = {'view': match.view_name if match else 'unresolved'}
+        registry = get_registry()
+        registry.inc('yatube_http_requests_total', {
+            **view,
+            'method': request.method,
+            'status': str(response.status_code),
+        })
+        registry.observe(
+            'yatube_http_request_duration_seconds', view, stats.total_time
+        )
+        if not response.streaming:
+            registry.observe(
+                'yatube_http_response_size_bytes', view,
+                len(response.content),
+            )
+        registry.observe('yatube_db_queries', view, stats.queries)
+        registry.inc(
+            'yatube_db_query_duration_seconds_total', view, stats.db_time
+        )
+        for result, count in (('hit', stats.cache_hits),
+                              ('miss', stats.cache_misses)):
+            if count:
+                registry.inc(
+                    'yatube_cache_requests_total',
+                    {**view, 'result': result}, count,
+                )
+        registry.flush()
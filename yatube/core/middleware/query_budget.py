@@ -0,0 +1,66 @@
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@contextmanager
+def record_queries():
+    """Собирает SQL всех запросов ко всем базам внутри блока."""
+    queries = []
+
+    def recorder(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield queries
+
+
+def get_query_budget(view_name):
+    return settings.QUERY_BUDGETS.get(
+        view_name, settings.QUERY_BUDGET_DEFAULT
+    )
+
+
+def check_query_budget(view_name, queries):
+    budget = get_query_budget(view_name)
+    if budget is None or len(queries) <= budget:
+        return
+    lines = [
+        f'{view_name}: выполнено {len(queries)} SQL-запросов '
+        f'при бюджете {budget}.'
+    ]
+    duplicates = [
+        (count, sql) for sql, count in Counter(queries).most_common()
+        if count > 1
+    ]
+    if duplicates:
+        lines.append('Повторяющиеся запросы:')
+        lines += [f'  {count} x {sql}' for count, sql in duplicates]
+    else:
+        lines.append('Запросы:')
+        lines += [f'  {sql}' for sql in queries]
+    raise QueryBudgetExceeded('\n'.join(lines))
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENFORCE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as queries:
+            response = self.get_response(request)
+        if request.resolver_match is not None:
+            check_query_budget(request.resolver_match.view_name, queries)
+        return response
@@ -0,0 +1,44 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.instrumentation import collect_request_stats
+
+logger = logging.getLogger('yatube.timing')
+
+
+def server_timing_header(stats):
+    return ', '.join((
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} SQL"',
+        f'tpl;dur={stats.template_time * 1000:.1f}',
+        f'cache;desc="hit={stats.cache_hits} miss={stats.cache_misses}"',
+        f'total;dur={stats.total_time * 1000:.1f}',
+    ))
+
+
+class ServerTimingMiddleware:
+    """Время SQL, шаблонов и обращения к кэшу за запрос: в заголовке
+    Server-Timing и в записи лога yatube.timing с именем представления."""
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_request_stats() as stats:
+            response = self.get_response(request)
+        response['Server-Timing'] = server_timing_header(stats)
+        match = request.resolver_match
+        view_name = match.view_name if match is not None else None
+        timings = stats.as_dict()
+        logger.info(
+            '%s %s %s', view_name, response.status_code, timings,
+            extra={
+                'view_name': view_name,
+                'status': response.status_code,
+                'timings': timings,
+            },
+        )
+        return response
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.slow_queries import record_slow_queries
+
+
+class SlowQueryMiddleware:
+    """Медленные и повторяющиеся SQL-запросы с местом в шаблоне или коде."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_RECORDERS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_slow_queries() as log:
+            response = self.get_response(request)
+            if request.resolver_match is not None:
+                log.view_name = request.resolver_match.view_name
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(verbose_name='Письмо')),
+                ('dedup_key', models.CharField(max_length=64, verbose_name='Ключ повтора')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата постановки')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')),
+                ('failed', models.DateTimeField(blank=True, null=True, verbose_name='Дата отказа')),
+            ],
+            options={
+                'verbose_name': 'Письмо в очереди',
+                'verbose_name_plural': 'Очередь писем',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('failed__isnull', True), ('sent__isnull', True)), fields=['next_attempt', 'id'], name='outbox_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['dedup_key', 'created'], name='outbox_dedup_idx'),
+        ),
+    ]
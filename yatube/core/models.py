@@ -0,0 +1,71 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+PENDING = Q(sent__isnull=True, failed__isnull=True)
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(PENDING)
+
+    def due(self, now=None):
+        return self.pending().filter(
+            next_attempt__lte=now or timezone.now()
+        ).order_by('next_attempt', 'pk')
+
+
+class OutboxMessage(models.Model):
+    """Письмо в очереди: его доставляет команда send_outbox."""
+    payload = models.TextField(verbose_name='Письмо')
+    dedup_key = models.CharField(
+        max_length=64,
+        verbose_name='Ключ повтора'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='Последняя ошибка'
+    )
+    sent = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+    failed = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отказа'
+    )
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = (
+            # Частичный индекс: доставленные письма его не раздувают
+            models.Index(
+                fields=('next_attempt', 'id'),
+                name='outbox_due_idx',
+                condition=PENDING,
+            ),
+            models.Index(
+                fields=('dedup_key', 'created'), name='outbox_dedup_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.pk}: {self.dedup_key[:8]}'
@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import json
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+from .db import retrying_atomic
+from .models import OutboxMessage
+
+
+def dump_email(message):
+    """JSON письма: вложения хранятся в base64."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Очередь принимает только вложения attach()')
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        attachments.append(
+            (filename, base64.b64encode(content).decode(), mimetype)
+        )
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }, ensure_ascii=False)
+
+
+def load_email(payload):
+    data = json.loads(payload)
+    attachments = data.pop('attachments')
+    data['alternatives'] = [tuple(item) for item in data['alternatives']]
+    message = EmailMultiAlternatives(**data)
+    for filename, content, mimetype in attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def dedup_key(payload):
+    """Повтором считается только письмо, совпадающее целиком. Ссылка
+    сброса пароля не меняется в течение дня, поэтому несколько нажатий
+    «Сбросить пароль» подряд дают одинаковые письма."""
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@retrying_atomic
+def enqueue(messages):
+    """Ставит письма в очередь, пропуская повторы за OUTBOX_DEDUP_SECONDS.
+    Отброшенное письмо повтором не мешает. Возвращает число новых писем
+    в очереди."""
+    rows = {}
+    for message in messages:
+        payload = dump_email(message)
+        key = dedup_key(payload)
+        rows.setdefault(key, OutboxMessage(payload=payload, dedup_key=key))
+    since = timezone.now() - timedelta(seconds=settings.OUTBOX_DEDUP_SECONDS)
+    recent = set(OutboxMessage.objects.filter(
+        dedup_key__in=rows, created__gte=since, failed__isnull=True
+    ).values_list('dedup_key', flat=True))
+    created = OutboxMessage.objects.bulk_create(
+        [row for key, row in rows.items() if key not in recent]
+    )
+    return len(created)
+
+
+@retrying_atomic
+def claim_due(limit):
+    """Забирает пачку писем, которым пора уходить. Пока пачка
+    отправляется, другие обработчики не видят ее OUTBOX_LEASE_SECONDS."""
+    now = timezone.now()
+    pks = list(OutboxMessage.objects.due(now).select_for_update(
+        skip_locked=True
+    ).values_list('pk', flat=True)[:limit])
+    if not pks:
+        return []
+    OutboxMessage.objects.filter(pk__in=pks).update(
+        next_attempt=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    )
+    return list(OutboxMessage.objects.filter(pk__in=pks).order_by('pk'))
+
+
+def retry_delay(attempts):
+    # Половина паузы случайна: упавшие вместе письма не повторяются
+    # одновременно, но и не уходят сразу же снова
+    delay = min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def deliver(messages, connection):
+    """Отправляет письма через открытое соединение и записывает итог:
+    неудачные откладываются, после OUTBOX_MAX_ATTEMPTS — отбрасываются.
+    Возвращает число доставленных писем."""
+    now = timezone.now()
+    sent = []
+    retried = []
+    for message in messages:
+        try:
+            connection.send_messages([load_email(message.payload)])
+        except Exception as error:
+            message.attempts += 1
+            message.last_error = f'{type(error).__name__}: {error}'
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.failed = now
+            else:
+                message.next_attempt = now + timedelta(
+                    seconds=retry_delay(message.attempts)
+                )
+            retried.append(message)
+            reopen(connection)
+        else:
+            sent.append(message.pk)
+    OutboxMessage.objects.filter(pk__in=sent).update(sent=now)
+    OutboxMessage.objects.bulk_update(
+        retried, ('attempts', 'last_error', 'next_attempt', 'failed')
+    )
+    return len(sent)
+
+
+def reopen(connection):
+    # После ошибки соединение могло оборваться
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        # Следующая отправка сама откроет соединение или упадет
+        pass
+
+
+def purge_sent():
+    """Удаляет доставленные письма старше OUTBOX_KEEP_SENT секунд."""
+    before = timezone.now() - timedelta(seconds=settings.OUTBOX_KEEP_SENT)
+    deleted, _ = OutboxMessage.objects.filter(sent__lt=before).delete()
+    return deleted
@@ -0,0 +1,117 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Эти приложения читаются только с основной базы: сессия и пользователь,
+# только что записанные при входе, могут еще не дойти до реплики.
+PRIMARY_APPS = ('auth', 'sessions', 'contenttypes', 'admin')
+
+_read_alias = ContextVar('read_alias', default=None)
+_wrote = ContextVar('wrote', default=False)
+
+_unhealthy_until = {}
+
+
+def probe(connection):
+    """SELECT 1 на сыром соединении: открытое по CONN_MAX_AGE соединение
+    могло умереть вместе с репликой. Запрос не попадает в бюджеты."""
+    connection.ensure_connection()
+    with connection.wrap_database_errors:
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+
+def replica_is_healthy(alias):
+    """Недоступная реплика пропускается REPLICA_RETRY_INTERVAL секунд."""
+    if _unhealthy_until.get(alias, 0) > time.monotonic():
+        return False
+    connection = connections[alias]
+    try:
+        probe(connection)
+    except DatabaseError:
+        _unhealthy_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_INTERVAL
+        )
+        # Следующая проверка откроет соединение заново
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+        return False
+    return True
+
+
+def choose_replica():
+    replicas = list(settings.REPLICA_DATABASES)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_is_healthy(alias):
+            return alias
+    return None
+
+
+def reading_from_replica():
+    return _read_alias.get() is not None
+
+
+class ReplicaRouter:
+    """Чтение в представлениях из REPLICA_VIEW_MODULES идет с реплик,
+    все остальное — с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения на время запроса.
+
+    После записи пользователь REPLICA_PIN_SECONDS секунд читает с основной
+    базы (это помнит cookie), чтобы сразу увидеть свои изменения.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_token = _read_alias.set(None)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() or request.method not in ('GET', 'HEAD'):
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            _read_alias.reset(read_token)
+            _wrote.reset(wrote_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and view_func.__module__ in settings.REPLICA_VIEW_MODULES
+                and settings.REPLICA_PIN_COOKIE not in request.COOKIES):
+            _read_alias.set(choose_replica())
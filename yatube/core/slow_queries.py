@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('yatube.slow_queries')
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+PARAMS_REPR_LIMIT = 500
+
+# Обертки execute_wrapper из core — не место, где выполнен запрос
+CORE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def fingerprint(sql):
+    """Списки IN разной длины дают один отпечаток."""
+    normalized = IN_LIST_RE.sub('IN (...)', sql)
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+def query_location(frame):
+    """Строка шаблона или кода проекта, из-за которой выполнен запрос.
+
+    Ближайший узел шаблона точнее всего: ленивое обращение вроде
+    {{ post.group.slug }} происходит при рендере этого узла.
+    """
+    project_line = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and hasattr(node, 'token'):
+            origin = node.origin
+            return (
+                f'{origin.template_name or origin.name}:{node.token.lineno}'
+            )
+        filename = frame.f_code.co_filename
+        if (project_line is None
+                and filename.startswith(settings.BASE_DIR)
+                and not filename.startswith(CORE_DIR)):
+            project_line = (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno}'
+            )
+        frame = frame.f_back
+    return project_line
+
+
+class QueryLog:
+    """SQL одного запроса к сайту: медленные запросы и отпечатки."""
+
+    def __init__(self, view_name):
+        self.view_name = view_name
+        self.slow = []
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, params, time.perf_counter() - started)
+
+    def add(self, sql, params, duration):
+        key = fingerprint(sql)
+        seen = self.fingerprints.get(key)
+        if seen is None:
+            seen = self.fingerprints[key] = {
+                'fingerprint': key, 'sql': sql, 'count': 0,
+                'duration_ms': 0.0, 'location': None,
+            }
+        seen['count'] += 1
+        seen['duration_ms'] += duration * 1000
+        # Стек разбирается только для повторов и медленных запросов
+        location = None
+        if seen['count'] == 2:
+            location = seen['location'] = query_location(sys._getframe(2))
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.slow.append({
+                'sql': sql,
+                'params': repr(params)[:PARAMS_REPR_LIMIT],
+                'duration_ms': round(duration * 1000, 2),
+                'fingerprint': key,
+                'location': location or query_location(sys._getframe(2)),
+            })
+
+    def repeated(self):
+        return [
+            {**seen, 'duration_ms': round(seen['duration_ms'], 2)}
+            for seen in self.fingerprints.values()
+            if seen['count'] >= settings.SLOW_QUERY_REPEAT_THRESHOLD
+        ]
+
+
+class LoggingRecorder:
+    """Пишет медленные и повторяющиеся запросы в лог yatube.slow_queries."""
+
+    def record_slow(self, view_name, query):
+        logger.warning(
+            'Медленный запрос %.1f мс в %s (%s)',
+            query['duration_ms'], view_name, query['location'],
+            extra={'view_name': view_name, 'query': query},
+        )
+
+    def record_repeated(self, view_name, queries):
+        for query in queries:
+            logger.warning(
+                'Запрос повторен %s раз в %s (%s)',
+                query['count'], view_name, query['location'],
+                extra={'view_name': view_name, 'query': query},
+            )
+
+
+def get_recorders():
+    return [import_string(path)() for path in settings.SLOW_QUERY_RECORDERS]
+
+
+@contextmanager
+def record_slow_queries(view_name=None):
+    """Передает медленные и повторяющиеся запросы блока регистраторам
+    из SLOW_QUERY_RECORDERS. Имя представления можно задать в log.view_name
+    внутри блока, когда оно станет известно."""
+    log = QueryLog(view_name)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+    recorders = get_recorders()
+    repeated = log.repeated()
+    for recorder in recorders:
+        for query in log.slow:
+            recorder.record_slow(log.view_name, query)
+        if repeated:
+            recorder.record_repeated(log.view_name, repeated)
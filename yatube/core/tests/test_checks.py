@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_cache
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Проверка общего для процессов кэша."""
+    def test_file_cache_passes(self):
+        """Файловый кэш из настроек общий для процессов."""
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'core.cache_backends.InstrumentedLocMemCache',
+    }})
+    def test_locmem_cache_warns(self):
+        """Кэш в памяти процесса дает предупреждение core.W001."""
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['core.W001'],
+        )
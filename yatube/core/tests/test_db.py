@@ -0,0 +1,63 @@
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.db import retrying_atomic
+
+
+class SqlitePragmasTests(TestCase):
+    """Соединение с SQLite настраивается при открытии."""
+    def test_pragmas_applied(self):
+        """PRAGMA из SQLITE_PRAGMAS действуют на соединении."""
+        expected = {
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'cache_size': -64 * 1024,
+        }
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+
+@override_settings(DB_WRITE_RETRY_ATTEMPTS=3, DB_WRITE_RETRY_DELAY=0)
+class RetryingAtomicTests(TransactionTestCase):
+    """Пишущая транзакция повторяется, пока база занята."""
+    def failing(self, failures, message='database is locked'):
+        calls = []
+
+        @retrying_atomic
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'ok'
+        return write, calls
+
+    def test_retries_until_success(self):
+        """После двух блокировок третья попытка проходит."""
+        write, calls = self.failing(2)
+        self.assertEqual(write(), 'ok')
+        self.assertEqual(calls, [True, True, True])
+
+    def test_attempts_are_bounded(self):
+        """Число попыток ограничено DB_WRITE_RETRY_ATTEMPTS."""
+        write, calls = self.failing(3)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_not_retried(self):
+        """Прочие ошибки базы не повторяются."""
+        write, calls = self.failing(1, 'no such table: posts_post')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+    def test_not_retried_inside_outer_transaction(self):
+        """Внутри внешней транзакции повторить запись нельзя."""
+        write, calls = self.failing(1)
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                write()
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+
+from core.loadtest import build_targets, percentile, summarize
+
+
+class LoadTestReportTests(SimpleTestCase):
+    """Сводка нагрузочного прогона."""
+    def test_percentile_nearest_rank(self):
+        """Процентиль берется по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_summarize_per_view(self):
+        """Задержки и статусы сводятся по имени представления."""
+        samples = [('posts:index', 200, 0.010)] * 9 + [
+            ('posts:index', 500, 0.100),
+            ('about:tech', 200, 0.005),
+        ]
+        report = summarize(samples, duration=2)
+        self.assertEqual(list(report), ['about:tech', 'posts:index'])
+        index = report['posts:index']
+        self.assertEqual(index['requests'], 10)
+        self.assertEqual(index['throughput'], 5)
+        self.assertEqual(index['statuses'], {'200': 9, '500': 1})
+        self.assertEqual(index['p50_ms'], 10)
+        self.assertEqual(index['p99_ms'], 100)
+
+    def test_targets_cover_named_urls(self):
+        """Адреса строятся для всех представлений, чьи параметры есть."""
+        targets = build_targets({
+            'slug': ['test-slug'],
+            'username': ['author'],
+            'post_id': [1, 2],
+            'uidb64': ['invalid'],
+            'token': ['invalid-token'],
+        })
+        self.assertEqual(targets['posts:post_detail'],
+                         ['/posts/1/', '/posts/2/'])
+        self.assertEqual(targets['posts:group_list'], ['/group/test-slug/'])
+        self.assertIn('users:logout', targets)
+        self.assertIn('about:tech', targets)
+
+    def test_views_without_values_skipped(self):
+        """Без групп адреса групп не запрашиваются."""
+        targets = build_targets({'slug': []})
+        self.assertNotIn('posts:group_list', targets)
+        self.assertIn('posts:index', targets)
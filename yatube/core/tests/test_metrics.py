@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+
+class MetricsTests(TestCase):
+    """Эндпоинт /metrics в формате Prometheus."""
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Свежий реестр процесса пишет в каталог теста
+        metrics._registry = None
+        self.addCleanup(setattr, metrics, '_registry', None)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_request_metrics_per_view(self):
+        """Счетчик запросов, гистограммы времени, размера и SQL."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_http_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_response_size_bytes_count{view="posts:index"} 2',
+            text
+        )
+        self.assertIn('yatube_db_queries_count{view="posts:index"} 2', text)
+        self.assertIn('# TYPE yatube_cache_hit_ratio gauge', text)
+
+    def test_concurrent_flushes(self):
+        """Одновременная запись из потоков не падает."""
+        registry = metrics.get_registry()
+        registry.inc('yatube_cache_requests_total', {'result': 'hit'})
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(
+                lambda _: registry.flush(force=True), range(200)
+            ))
+        self.assertEqual(os.listdir(self.directory), [
+            os.path.basename(registry.path)
+        ])
+
+    def test_processes_aggregated(self):
+        """Файлы других процессов суммируются с текущим."""
+        self.client.get(reverse('posts:index'))
+        key = metrics.metric_key('yatube_http_requests_total', {
+            'view': 'posts:index', 'method': 'GET', 'status': '200',
+        })
+        with open(os.path.join(self.directory, '1-other.json'), 'w') as file:
+            json.dump({'counters': {key: 5}, 'histograms': {}}, file)
+        self.assertIn(
+            'yatube_http_requests_total{method="GET",status="200",'
+            'view="posts:index"} 6', self.scrape()
+        )
+
+    def test_cache_hit_ratio(self):
+        """Доля попаданий считается по счетчикам обращений к кэшу."""
+        registry = metrics.get_registry()
+        registry.inc('yatube_cache_requests_total',
+                     {'view': 'posts:index', 'result': 'hit'}, 3)
+        registry.inc('yatube_cache_requests_total',
+                     {'view': 'posts:index', 'result': 'miss'}, 1)
+        self.assertIn('yatube_cache_hit_ratio 0.75', self.scrape())
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины гистограммы накопительные."""
+        registry = metrics.get_registry()
+        for value in (0, 3, 3, 500):
+            registry.observe('yatube_db_queries', {'view': 'v'}, value)
+        text = self.scrape()
+        self.assertIn('yatube_db_queries_bucket{view="v",le="0"} 1', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="5"} 3', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="100"} 3', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="+Inf"} 4', text)
+        self.assertIn('yatube_db_queries_sum{view="v"} 506', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=())
+    def test_metrics_hidden_from_other_hosts(self):
+        """Посторонним адресам эндпоинт недоступен."""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
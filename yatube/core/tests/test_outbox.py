@@ -0,0 +1,211 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import OutboxMessage
+from core.outbox import dump_email, load_email
+
+User = get_user_model()
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class FailingBackend(BaseEmailBackend):
+    """Почтовый сервер недоступен."""
+    def send_messages(self, email_messages):
+        raise ConnectionError('mail server is down')
+
+
+class CountingBackend(BaseEmailBackend):
+    """Считает открытия соединения."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, email_messages):
+        mail.outbox.extend(email_messages)
+        return len(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail_backends.OutboxEmailBackend',
+    OUTBOX_DELIVERY_BACKEND=LOCMEM,
+)
+class OutboxTests(TestCase):
+    """Письма ставятся в очередь и доставляются send_outbox."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+
+    def request_reset(self):
+        return self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': self.user.email},
+        )
+
+    def send_outbox(self, *args):
+        out = StringIO()
+        call_command('send_outbox', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reset_only_enqueues(self):
+        """Сброс пароля не отправляет письмо, а ставит его в очередь."""
+        response = self.request_reset()
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        message = load_email(OutboxMessage.objects.get().payload)
+        self.assertEqual(message.to, [self.user.email])
+        self.assertIn('/reset/', message.body)
+
+    @override_settings(
+        OUTBOX_DELIVERY_BACKEND='core.tests.test_outbox.FailingBackend'
+    )
+    def test_reset_independent_of_delivery(self):
+        """Недоступный почтовый сервер не мешает сбросу пароля."""
+        response = self.request_reset()
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(OutboxMessage.objects.pending().count(), 1)
+
+    def test_repeated_reset_deduplicated(self):
+        """Повторные сбросы подряд дают одно письмо."""
+        for _ in range(3):
+            self.request_reset()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.send_outbox()
+        self.request_reset()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_different_messages_not_deduplicated(self):
+        """Разные письма с одной темой тому же адресату не теряются."""
+        mail.send_mail('Тема', 'Первое', None, ['a@example.com'])
+        mail.send_mail('Тема', 'Второе', None, ['a@example.com'])
+        mail.send_mail('Тема', 'Первое', None, ['a@example.com'])
+        self.assertEqual(
+            sorted(
+                load_email(payload).body for payload in
+                OutboxMessage.objects.values_list('payload', flat=True)
+            ),
+            ['Второе', 'Первое'],
+        )
+
+    def test_reset_after_failure_enqueued(self):
+        """Отброшенное письмо не мешает запросить сброс снова."""
+        self.request_reset()
+        OutboxMessage.objects.update(failed=timezone.now())
+        self.request_reset()
+        self.assertEqual(OutboxMessage.objects.pending().count(), 1)
+
+    @override_settings(OUTBOX_DEDUP_SECONDS=0)
+    def test_reset_after_window_enqueued(self):
+        """После окна повторов письмо снова ставится в очередь."""
+        self.request_reset()
+        self.request_reset()
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_send_outbox_delivers(self):
+        """send_outbox доставляет письма и отмечает их отправленными."""
+        mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+        mail.send_mail('Тема', 'Текст', None, ['b@example.com'])
+        self.assertEqual(mail.outbox, [])
+        output = self.send_outbox()
+        self.assertIn('Доставлено писем: 2 из 2', output)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['a@example.com', 'b@example.com'],
+        )
+        self.assertFalse(OutboxMessage.objects.pending().exists())
+        self.send_outbox()
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(
+        OUTBOX_DELIVERY_BACKEND='core.tests.test_outbox.CountingBackend'
+    )
+    def test_batches_share_connection(self):
+        """Все пачки идут через одно открытое соединение."""
+        for number in range(5):
+            mail.send_mail('Тема', 'Текст', None, [f'{number}@example.com'])
+        CountingBackend.opened = 0
+        output = self.send_outbox('--batch-size', '2')
+        self.assertEqual(output.count('Пачка'), 3)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(
+        OUTBOX_DELIVERY_BACKEND='core.tests.test_outbox.FailingBackend',
+        OUTBOX_RETRY_DELAY=60,
+        OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failed_delivery_retried_with_backoff(self):
+        """Недоставленное письмо откладывается, потом отбрасывается."""
+        mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+        before = timezone.now()
+        self.send_outbox()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('mail server is down', message.last_error)
+        self.assertIsNone(message.failed)
+        self.assertGreaterEqual(
+            message.next_attempt, before + timedelta(seconds=30)
+        )
+        self.send_outbox()
+        self.assertEqual(OutboxMessage.objects.get().attempts, 1)
+        OutboxMessage.objects.update(next_attempt=before)
+        self.send_outbox()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 2)
+        self.assertIsNotNone(message.failed)
+
+    @override_settings(OUTBOX_KEEP_SENT=0)
+    def test_sent_messages_purged(self):
+        """Старые доставленные письма удаляются."""
+        mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+        self.send_outbox()
+        self.send_outbox()
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(OUTBOX_KEEP_SENT=0)
+    def test_loop_purges_sent_messages(self):
+        """В режиме --loop старые письма удаляются при простое."""
+        mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+        sleep = mock.patch(
+            'core.management.commands.send_outbox.time.sleep',
+            side_effect=KeyboardInterrupt,
+        )
+        with sleep, self.assertRaises(KeyboardInterrupt):
+            self.send_outbox('--loop')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_payload_roundtrip(self):
+        """Письмо восстанавливается из очереди вместе с вложениями."""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], headers={'X-Tag': 'reset'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\x01', 'application/octet-stream')
+        restored = load_email(dump_email(message))
+        self.assertEqual(restored.recipients(), message.recipients())
+        self.assertEqual(restored.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(
+            restored.alternatives, [('<p>Текст</p>', 'text/html')]
+        )
+        self.assertEqual(
+            restored.attachments,
+            [('data.bin', b'\x00\x01', 'application/octet-stream')],
+        )
+        self.assertIsInstance(restored, EmailMessage)
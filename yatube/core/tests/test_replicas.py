@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import replicas
+from posts import views
+from posts.models import Post
+from users.views import SignUp
+
+User = get_user_model()
+
+router = replicas.ReplicaRouter()
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """Чтение лент идет с реплики, запись и сессии — с основной базы."""
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.routed = {}
+        healthy = mock.patch.object(
+            replicas, 'replica_is_healthy', return_value=True
+        )
+        healthy.start()
+        self.addCleanup(healthy.stop)
+
+    def request(self, view, method='get', write=False, **kwargs):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            self.routed = {
+                'post': router.db_for_read(Post),
+                'user': router.db_for_read(User),
+            }
+            if write:
+                router.db_for_write(Post)
+            return HttpResponse()
+        middleware = replicas.ReplicaMiddleware(get_response)
+        request = getattr(self.factory, method)('/', **kwargs)
+        return middleware(request)
+
+    def test_feed_reads_from_replica(self):
+        """GET представления постов читает посты с реплики."""
+        self.request(views.index)
+        self.assertEqual(self.routed['post'], 'replica')
+
+    def test_auth_reads_from_primary(self):
+        """Пользователи читаются с основной базы."""
+        self.request(views.index)
+        self.assertEqual(self.routed['user'], DEFAULT_DB_ALIAS)
+
+    def test_other_views_read_from_primary(self):
+        """Представления вне REPLICA_VIEW_MODULES читают с основной базы."""
+        self.request(SignUp.as_view())
+        self.assertEqual(self.routed['post'], DEFAULT_DB_ALIAS)
+
+    def test_post_reads_from_primary(self):
+        """POST-запросы читают с основной базы."""
+        self.request(views.post_create, method='post')
+        self.assertEqual(self.routed['post'], DEFAULT_DB_ALIAS)
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи чтение закреплено за основной базой."""
+        response = self.request(views.index, write=True)
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.factory.cookies[settings.REPLICA_PIN_COOKIE] = cookie.value
+        self.request(views.index)
+        self.assertEqual(self.routed['post'], DEFAULT_DB_ALIAS)
+
+    def test_reads_do_not_pin(self):
+        """Чтение не закрепляет пользователя за основной базой."""
+        response = self.request(views.index)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_state_reset_after_request(self):
+        """Вне запроса все читается с основной базы."""
+        self.request(views.index)
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertFalse(replicas.reading_from_replica())
+
+
+class ReplicaFailoverTests(TestCase):
+    """Недоступная реплика заменяется основной базой."""
+    def setUp(self):
+        connections.databases['broken'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': 'file:/nonexistent/replica.sqlite3?mode=ro',
+        }
+        self.addCleanup(connections.databases.pop, 'broken')
+        connections.databases['flaky'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+        self.addCleanup(connections.databases.pop, 'flaky')
+        self.addCleanup(replicas._unhealthy_until.clear)
+
+    @override_settings(REPLICA_DATABASES=['broken'])
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Без доступных реплик выбирается основная база."""
+        self.assertIsNone(replicas.choose_replica())
+        self.assertIn('broken', replicas._unhealthy_until)
+
+    @override_settings(REPLICA_DATABASES=['broken', 'default'])
+    def test_unhealthy_replica_skipped(self):
+        """Пока реплика недоступна, к ней не подключаются."""
+        replicas.replica_is_healthy('broken')
+        with mock.patch.object(
+            connections['broken'], 'ensure_connection'
+        ) as ensure_connection:
+            self.assertEqual(replicas.choose_replica(), 'default')
+        ensure_connection.assert_not_called()
+
+    @override_settings(REPLICA_DATABASES=['flaky'])
+    def test_open_connection_probed(self):
+        """Открытое соединение с упавшей репликой не считается живым."""
+        connection = connections['flaky']
+        self.assertEqual(replicas.choose_replica(), 'flaky')
+        self.addCleanup(connection.close)
+        raw = connection.connection
+        with mock.patch.object(connection, 'connection') as broken:
+            broken.cursor.return_value.execute.side_effect = (
+                raw.OperationalError('disk I/O error')
+            )
+            self.assertIsNone(replicas.choose_replica())
+        self.assertIn('flaky', replicas._unhealthy_until)
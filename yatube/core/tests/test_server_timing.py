@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.instrumentation import collect_request_stats
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTests(TestCase):
+    """Время SQL, шаблонов и кэша за запрос."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит метрики db, tpl, cache и total."""
+        response = self.client.get(reverse('posts:index'))
+        metrics = [
+            part.strip().split(';')[0]
+            for part in response['Server-Timing'].split(',')
+        ]
+        self.assertEqual(metrics, ['db', 'tpl', 'cache', 'total'])
+
+    def test_timing_log_keyed_by_view_name(self):
+        """Запись лога содержит имя представления и показатели запроса."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            self.client.get(url)
+        record = logs.records[0]
+        self.assertEqual(record.view_name, 'posts:post_detail')
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.timings['queries'], 0)
+        self.assertGreater(record.timings['template_ms'], 0)
+
+    def test_cache_hits_and_misses_counted(self):
+        """get и get_many считают попадания и промахи по ключам."""
+        cache.set('present', 1)
+        with collect_request_stats() as stats:
+            cache.get('present')
+            cache.get('absent')
+            cache.get_many(['present', 'absent', 'other'])
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 3))
+
+    def test_cache_default_preserved(self):
+        """Промах возвращает переданное значение по умолчанию."""
+        self.assertEqual(cache.get('absent', 'default'), 'default')
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_can_be_disabled(self):
+        """Без SERVER_TIMING_ENABLED заголовок не добавляется."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
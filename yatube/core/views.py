@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .metrics import collect, get_registry, render
+
+
+def metrics(request):
+    """Метрики всех процессов в формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    get_registry().flush(force=True)
+    return HttpResponse(
+        render(*collect(settings.METRICS_DIR)),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
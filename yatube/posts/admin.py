@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import build_match_query, matching_post_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        match = build_match_query(search_term)
+        if not match:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=matching_post_ids(match)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+
+from core.replicas import reading_from_replica
+from .rendering import EXCERPT_LENGTH
+
+# Поколение главной ленты меняется при любом изменении постов,
+# поколение всех лент — при массовых операциях, после которых
+# неизвестно, какие группы и авторы затронуты.
+POSTS_GENERATION = 'posts:generation'
+FEEDS_GENERATION = 'posts:generation:feeds'
+GROUP_GENERATION = 'posts:generation:group:{}'
+AUTHOR_GENERATION = 'posts:generation:author:{}'
+
+# Увеличивается при смене шаблона карточки поста: ключи всех закэшированных
+# карточек меняются без перерисовки тел постов
+CARD_VERSION = 1
+
+
+def index_generations():
+    return [POSTS_GENERATION]
+
+
+def group_generations(slug):
+    return [FEEDS_GENERATION, GROUP_GENERATION.format(slug)]
+
+
+def profile_generations(username):
+    return [FEEDS_GENERATION, AUTHOR_GENERATION.format(username)]
+
+
+def get_generations(keys):
+    """Поколение — время последнего изменения ленты в наносекундах."""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def set_generations(keys):
+    cache.set_many(dict.fromkeys(keys, time.time_ns()), None)
+
+
+def bump_generations(*keys):
+    """Внутри транзакции поколения меняются еще раз после фиксации:
+    гость, прочитавший старые строки до фиксации, кладет страницу под
+    ключ промежуточного поколения, которое больше не используется."""
+    set_generations(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: set_generations(keys))
+
+
+def request_generations(request, keys):
+    """Поколения читаются из кэша один раз за запрос."""
+    known = request.__dict__.setdefault('_feed_generations', {})
+    missing = [key for key in keys if key not in known]
+    if missing:
+        known.update(zip(missing, get_generations(missing)))
+    return [known[key] for key in keys]
+
+
+def generations_modified(generations):
+    return datetime.fromtimestamp(max(generations) / 10 ** 9, timezone.utc)
+
+
+def feed_version(request, generation_keys):
+    """Хэш адреса страницы и поколений ленты: меняется вместе с лентой."""
+    generations = request_generations(request, generation_keys)
+    raw = f'{generations}:{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_cache_key(request, generation_keys):
+    return 'posts:page:' + feed_version(request, generation_keys)
+
+
+def feed_cache_timeout():
+    # Реплика могла еще не получить запись, которая сменила поколение,
+    # поэтому прочитанная с нее страница живет не дольше ее отставания
+    if reading_from_replica():
+        return settings.REPLICA_PIN_SECONDS
+    return settings.FEED_CACHE_TIMEOUT
+
+
+def cache_feed(generation_keys):
+    """Кэширует страницу ленты для гостей до смены поколений ленты."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request, generation_keys(*args, **kwargs))
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response, feed_cache_timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+def post_card_key(post):
+    """Ключ карточки меняется при каждом сохранении поста, при
+    перерисовке его тела, когда готовы миниатюры картинки, а также при
+    смене имени автора и адреса группы, которые видны в карточке."""
+    image = getattr(post, 'image', None)
+    thumbnails = '-' if image is None else int(bool(image.thumbnails))
+    author = post.author
+    slug = post.group.slug if post.group_id is not None else ''
+    links = hashlib.md5(
+        f'{author.username}:{author.get_full_name()}:{slug}'.encode()
+    ).hexdigest()
+    return (
+        f'posts:card:{CARD_VERSION}:{EXCERPT_LENGTH}:{post.pk}:'
+        f'{post.updated.timestamp()}:{post.text_html_version}:'
+        f'{thumbnails}:{links}:{get_language()}'
+    )
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .cache import (feed_version, generations_modified, profile_generations,
+                    request_generations)
+from .models import Post
+
+
+def user_etag(request, version):
+    """Шапка страницы зависит от пользователя, поэтому и ETag тоже."""
+    raw = f'{version}:{request.user.pk}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_condition(generation_keys):
+    """Условный GET для ленты по её поколениям, без запросов к БД."""
+    def etag_func(request, *args, **kwargs):
+        keys = generation_keys(*args, **kwargs)
+        return user_etag(request, feed_version(request, keys))
+
+    def last_modified_func(request, *args, **kwargs):
+        keys = generation_keys(*args, **kwargs)
+        return generations_modified(request_generations(request, keys))
+
+    return condition(
+        etag_func=etag_func, last_modified_func=last_modified_func
+    )
+
+
+def post_validators(request, post_id):
+    """Дата правки поста и поколения его автора за один запрос по pk."""
+    if '_post_validators' not in request.__dict__:
+        row = Post.objects.filter(pk=post_id).order_by().values_list(
+            'updated', 'author__username'
+        ).first()
+        if row is not None:
+            updated, username = row
+            row = updated, request_generations(
+                request, profile_generations(username)
+            )
+        request._post_validators = row
+    return request._post_validators
+
+
+def post_etag(request, post_id):
+    validators = post_validators(request, post_id)
+    if validators is None:
+        return None
+    updated, generations = validators
+    return user_etag(
+        request, f'{post_id}:{updated.timestamp()}:{generations}'
+    )
+
+
+def post_last_modified(request, post_id):
+    validators = post_validators(request, post_id)
+    if validators is None:
+        return None
+    updated, generations = validators
+    return max(updated, generations_modified(generations))
+
+
+post_condition = condition(
+    etag_func=post_etag, last_modified_func=post_last_modified
+)
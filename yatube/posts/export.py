@@ -0,0 +1,68 @@
+import csv
+import json
+import zlib
+
+# Поля совпадают с форматом import_posts, выгрузку можно загрузить обратно
+EXPORT_FIELDS = ('text', 'author', 'group', 'pub_date')
+EXPORT_COLUMNS = ('text', 'author__username', 'group__slug', 'pub_date')
+EXPORT_ORDERING = ('pub_date', 'pk')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: writerow возвращает готовую строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_records(rows):
+    for text, author, group, pub_date in rows:
+        yield text, author, group, pub_date.isoformat()
+
+
+def serialize_jsonl(rows):
+    for record in export_records(rows):
+        yield json.dumps(
+            dict(zip(EXPORT_FIELDS, record)), ensure_ascii=False
+        ) + '\n'
+
+
+def serialize_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for text, author, group, pub_date in export_records(rows):
+        yield writer.writerow((text, author or '', group or '', pub_date))
+
+
+SERIALIZERS = {
+    'jsonl': serialize_jsonl,
+    'csv': serialize_csv,
+}
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(posts, data_format='jsonl', compress=False,
+                  chunk_size=2000):
+    """Байтовые куски выгрузки, в памяти не больше chunk_size постов."""
+    rows = posts.order_by(*EXPORT_ORDERING).values_list(
+        *EXPORT_COLUMNS
+    ).iterator(chunk_size=chunk_size)
+    chunks = (
+        line.encode('utf-8') for line in SERIALIZERS[data_format](rows)
+    )
+    if compress:
+        return gzip_chunks(chunks)
+    return chunks
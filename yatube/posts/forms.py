@@ -15,3 +15,12 @@ class PostForm(forms.ModelForm):
             'text': 'Текст нового поста',
             'group': 'Можно оставить поле пустым',
         }
+
+
+class PostImageForm(forms.Form):
+    """Картинка поста хранится в PostImage, поэтому форма отдельная."""
+    image = forms.ImageField(
+        required=False,
+        label='Картинка',
+        help_text='Можно приложить картинку к посту',
+    )
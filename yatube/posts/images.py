@@ -0,0 +1,71 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import PostImage
+
+IMAGE_DIR = 'posts'
+THUMBNAIL_DIR = 'thumbs'
+
+
+def content_name(upload):
+    """Имя файла по sha256 содержимого: posts/ab/abcd….jpg."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    digest = digest.hexdigest()
+    extension = os.path.splitext(upload.name)[1].lower() or '.jpg'
+    return f'{IMAGE_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def thumbnail_name(name, size):
+    width, height = size
+    digest = os.path.splitext(os.path.basename(name))[0]
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}_{width}x{height}.jpg'
+
+
+def store_image(upload):
+    """Сохраняет файл картинки и возвращает его имя. Одинаковые картинки
+    хранятся одним файлом. Вызывается вне транзакции: при ее повторе файл
+    не пишется заново."""
+    name = content_name(upload)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    return name
+
+
+def attach_image(post, name):
+    """Привязывает сохраненный файл к посту, миниатюры для него строит
+    make_thumbnails."""
+    if not PostImage.objects.filter(post=post).update(
+        file=name, thumbnails=''
+    ):
+        PostImage.objects.create(post=post, file=name)
+
+
+def build_thumbnails(name):
+    """Строит все размеры из POST_THUMBNAIL_SIZES и возвращает их адреса.
+    Выполняется в процессах make_thumbnails и не обращается к базе."""
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    urls = {}
+    for size_name, size in settings.POST_THUMBNAIL_SIZES.items():
+        target = thumbnail_name(name, size)
+        # Имя зависит только от содержимого и размера: готовую миниатюру
+        # с прошлого запуска или от другого поста можно не строить
+        if not default_storage.exists(target):
+            buffer = BytesIO()
+            ImageOps.fit(image, size, Image.LANCZOS).save(
+                buffer, 'JPEG',
+                quality=settings.POST_THUMBNAIL_QUALITY, optimize=True,
+            )
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+        urls[size_name] = default_storage.url(target)
+    return urls
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import SERIALIZERS, export_chunks
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка постов в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки, по умолчанию stdout'
+        )
+        parser.add_argument('--format', choices=SERIALIZERS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--author', help='Выгрузить посты одного автора')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['author']:
+            try:
+                author = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден'
+                )
+            posts = author.posts.all()
+        chunks = export_chunks(
+            posts,
+            options['format'],
+            options['gzip'],
+            options['chunk_size'],
+        )
+        path = options['path']
+        if path == '-':
+            output = sys.stdout.buffer
+            output.writelines(chunks)
+            output.flush()
+            return
+        with open(path, 'wb') as output:
+            output.writelines(chunks)
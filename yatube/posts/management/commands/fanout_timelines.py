@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import FanoutTask
+from posts.timeline import fan_out_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает по лентам подписок посты авторов с большим числом '
+        'подписчиков. Каждая пачка подписчиков — отдельная транзакция, '
+        'прерванная раскладка продолжается с последнего подписчика.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        batch_size = (
+            options['batch_size'] or settings.TIMELINE_FANOUT_BATCH_SIZE
+        )
+        done = 0
+        for pk in list(FanoutTask.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )):
+            task = FanoutTask.objects.select_related('post').filter(
+                pk=pk
+            ).first()
+            if task is None:
+                continue
+            batches = 1
+            while fan_out_batch(task, batch_size):
+                batches += 1
+            done += 1
+            self.stdout.write(f'Пост {pk}: {batches} пачек')
+        self.stdout.write(self.style.SUCCESS(f'Разложено постов: {done}'))
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Group, Post, User
+from posts.utils import preserve_auto_dates
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: {error}')
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт постов из JSONL или CSV с полями text, author, '
+        'group и pub_date. Недостающие авторы и группы создаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для импорта, по умолчанию stdin'
+        )
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с числом уже импортированных записей'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format']
+        if data_format is None:
+            data_format = 'csv' if path.endswith('.csv') else 'jsonl'
+        self.authors = {}
+        self.groups = {}
+        checkpoint = options['checkpoint']
+        done = self.read_checkpoint(checkpoint)
+        if path == '-':
+            stream = nullcontext(sys.stdin)
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+        started = time.monotonic()
+        imported = 0
+        with stream as file, preserve_auto_dates(Post):
+            records = islice(READERS[data_format](file), done, None)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                posts = self.build_posts(batch, done + imported + 1)
+                with transaction.atomic():
+                    Post.objects.bulk_create(posts)
+                imported += len(batch)
+                self.write_checkpoint(checkpoint, done + imported)
+                rate = imported / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'Импортировано {done + imported} записей, '
+                    f'{rate:.0f} записей/с'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен: {imported} новых записей'
+        ))
+
+    def read_checkpoint(self, checkpoint):
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as file:
+            return int(file.read().strip() or 0)
+
+    def write_checkpoint(self, checkpoint, done):
+        if checkpoint is None:
+            return
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            file.write(str(done))
+        os.replace(temporary, checkpoint)
+
+    def resolve(self, cache, model, field, values, defaults):
+        """Заполняет cache значениями {field: pk}, создавая недостающие."""
+        missing = {value for value in values if value and value not in cache}
+        if not missing:
+            return
+        cache.update(model.objects.filter(
+            **{f'{field}__in': missing}
+        ).values_list(field, 'pk'))
+        missing -= cache.keys()
+        if missing:
+            model.objects.bulk_create(
+                [model(**{field: value}, **defaults(value))
+                 for value in missing],
+                ignore_conflicts=True,
+            )
+            cache.update(model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'))
+
+    def build_posts(self, batch, first):
+        """first — номер первой записи пачки для сообщений об ошибках."""
+        for number, record in enumerate(batch, first):
+            if not isinstance(record, dict):
+                raise CommandError(f'Запись {number}: ожидается объект')
+        self.resolve(
+            self.authors, User, 'username',
+            {record.get('author') for record in batch},
+            lambda username: {'password': make_password(None)},
+        )
+        self.resolve(
+            self.groups, Group, 'slug',
+            {record.get('group') for record in batch},
+            lambda slug: {'title': slug, 'description': ''},
+        )
+        now = timezone.now()
+        posts = []
+        for number, record in enumerate(batch, first):
+            try:
+                pub_date = parse_datetime(record.get('pub_date') or '') or now
+            except (TypeError, ValueError) as error:
+                raise CommandError(f'Запись {number}: pub_date: {error}')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+            posts.append(Post(
+                text=record.get('text') or '',
+                author_id=self.authors.get(record.get('author')),
+                group_id=self.groups.get(record.get('group')),
+                pub_date=pub_date,
+                updated=pub_date,
+            ))
+        return posts
@@ -0,0 +1,62 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+
+from posts.cache import FEEDS_GENERATION, POSTS_GENERATION, bump_generations
+from posts.images import build_thumbnails
+from posts.models import PostImage
+
+
+def safe_build_thumbnails(name):
+    try:
+        return build_thumbnails(name)
+    except (OSError, UnidentifiedImageError) as error:
+        return str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит миниатюры новых картинок постов в пуле процессов и '
+        'сохраняет их адреса: шаблоны не обращаются к файлам при показе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = PostImage.objects.filter(thumbnails='').order_by('pk')
+        last_pk = 0
+        built = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(images.filter(
+                    pk__gt=last_pk
+                )[:options['batch_size']])
+                if not batch:
+                    break
+                results = pool.map(
+                    safe_build_thumbnails, [image.file.name for image in batch]
+                )
+                for image, urls in zip(batch, results):
+                    if isinstance(urls, str):
+                        # Битый файл больше не пробуем, шаблоны покажут
+                        # его как есть
+                        self.stderr.write(f'{image.file.name}: {urls}')
+                        urls = {}
+                    # Пока строились миниатюры, картинку могли заменить:
+                    # тогда новая остается необработанной
+                    built += PostImage.objects.filter(
+                        pk=image.pk, file=image.file.name, thumbnails=''
+                    ).update(thumbnails=json.dumps(urls))
+                last_pk = batch[-1].pk
+                self.stdout.write(f'Обработано картинок: {built}')
+        if built:
+            # Готовые страницы лент показывают картинки без миниатюр
+            bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры построены для {built} картинок'
+        ))
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Follow, GroupStats, Post
+from posts.timeline import schedule_fan_out
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов авторов и групп, подписчиков, '
+        'даты последних постов и рейтинг активности групп'
+    )
+
+    def add_arguments(self, parser):
+        # SQLite вставляет не больше 500 строк одним запросом
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            celebrities = set(AuthorStats.objects.filter(
+                celebrity=True
+            ).values_list('pk', flat=True))
+            for field, stats in Post.objects.counted_fields():
+                counts = dict(Post.objects.filter(
+                    **{f'{field}__isnull': False}
+                ).order_by().values_list(field).annotate(Count('pk')))
+                related_model = stats._meta.pk.related_model
+                stats.objects.all().delete()
+                created = stats.objects.bulk_create(
+                    (
+                        stats(pk=pk, posts_count=counts.get(pk, 0))
+                        for pk in related_model.objects.values_list(
+                            'pk', flat=True
+                        ).iterator()
+                    ),
+                    batch_size=options['batch_size'],
+                )
+                self.stdout.write(
+                    f'{stats._meta.verbose_name_plural}: {len(created)}'
+                )
+            AuthorStats.objects.update(followers_count=Coalesce(Subquery(
+                Follow.objects.filter(author=OuterRef('pk')).order_by()
+                .values('author').annotate(count=Count('pk')).values('count')
+            ), 0))
+            self.restore_celebrities(celebrities)
+            GroupStats.objects.refresh_activity()
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
+
+    def restore_celebrities(self, celebrities):
+        """Знаменитости остаются ими до TIMELINE_CELEBRITY_EXIT_FOLLOWERS,
+        как и при отписках. Посты бывших знаменитостей раскладываются."""
+        AuthorStats.objects.filter(
+            Q(followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS)
+            | Q(
+                pk__in=celebrities,
+                followers_count__gte=(
+                    settings.TIMELINE_CELEBRITY_EXIT_FOLLOWERS
+                ),
+            )
+        ).update(celebrity=True)
+        for pk in celebrities.difference(AuthorStats.objects.filter(
+            celebrity=True
+        ).values_list('pk', flat=True)):
+            schedule_fan_out(pk)
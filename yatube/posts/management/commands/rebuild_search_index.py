@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts.search import FTS_TABLE
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+                'FROM posts_post'
+            )
+            self.stdout.write(f'Проиндексировано постов: {cursor.rowcount}')
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.cache import FEEDS_GENERATION, POSTS_GENERATION, bump_generations
+from posts.models import Post
+from posts.rendering import RENDER_VERSION, render_post
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит HTML тела постов, оформленных по старой версии правил '
+        'или еще не оформленных. Обходит посты пачками по первичному ключу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерисовать все посты, а не только устаревшие'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk').only('pk', 'text')
+        if not options['all']:
+            posts = posts.exclude(text_html_version=RENDER_VERSION)
+        last_pk = 0
+        rendered = 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for post in batch:
+                render_post(post)
+            with transaction.atomic():
+                Post.objects.bulk_update(
+                    batch, ['text_html', 'text_html_version']
+                )
+            last_pk = batch[-1].pk
+            rendered += len(batch)
+            self.stdout.write(f'Обработано постов: {rendered}')
+        if rendered:
+            # Кэш карточек учитывает версию, а страницы лент — только
+            # поколения: без сброса гости увидели бы старое оформление
+            bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Тела постов построены по версии {RENDER_VERSION}: {rendered}'
+        ))
@@ -0,0 +1,237 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.cache import FEEDS_GENERATION, POSTS_GENERATION, bump_generations
+from posts.models import Group, Post, User
+from posts.rendering import RENDER_VERSION, render_text
+from posts.search import FTS_INSERT_TRIGGER, FTS_INSERT_TRIGGER_SQL
+
+FIRST_NAMES = (
+    'Александр', 'Мария', 'Иван', 'Анна', 'Дмитрий', 'Елена', 'Сергей',
+    'Ольга', 'Андрей', 'Татьяна', 'Алексей', 'Наталья', 'Михаил', 'Ирина',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков',
+)
+WORDS = (
+    'город', 'утро', 'дорога', 'книга', 'кофе', 'друг', 'работа', 'море',
+    'поезд', 'вечер', 'музыка', 'лес', 'зима', 'лето', 'проект', 'код',
+    'ёлка', 'дом', 'окно', 'кот', 'новости', 'фото', 'история', 'путь',
+    'сегодня', 'вчера', 'снова', 'очень', 'много', 'новый', 'старый',
+    'первый', 'хороший', 'долгий', 'тихий', 'видел', 'читал', 'писал',
+    'думаю', 'помню', 'hello', 'python', 'django', 'release', 'bug',
+)
+TOPICS = (
+    'Путешествия', 'Книги', 'Кино', 'Музыка', 'Программирование', 'Спорт',
+    'Кулинария', 'Фотография', 'Наука', 'Игры', 'Искусство', 'Природа',
+)
+
+# Размер набора предложений, из которых собираются тексты постов
+SENTENCES = 5000
+
+
+def zipf_cum_weights(count, skew):
+    """Накопленные веса распределения Ципфа: k-й по рангу весит 1/k^skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами и постами. '
+        'Число постов у авторов и групп распределено по Ципфу, даты '
+        'публикации разбросаны по --days дням. При одинаковом --seed '
+        'данные совпадают. На время загрузки индексы постов снимаются, '
+        'запускать на работающем сайте не стоит.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для авторов и групп'
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.6,
+            help='Доля постов, опубликованных в группах'
+        )
+        parser.add_argument('--days', type=int, default=5 * 365)
+        parser.add_argument(
+            '--until', default='2025-01-01',
+            help='Дата самого позднего поста, ГГГГ-ММ-ДД'
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имен пользователей и slug групп'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        if (User.objects.filter(username__startswith=self.prefix).exists()
+                or Group.objects.filter(slug__startswith=self.prefix)
+                .exists()):
+            raise CommandError(
+                f'Данные с префиксом {self.prefix} уже есть, '
+                'укажите другой --prefix'
+            )
+        try:
+            until = datetime.strptime(options['until'], '%Y-%m-%d')
+        except ValueError:
+            raise CommandError('--until ожидается в формате ГГГГ-ММ-ДД')
+        self.since = until - timedelta(days=options['days'])
+        self.seconds = options['days'] * 24 * 60 * 60
+        started = time.monotonic()
+        author_ids = self.create_users(options['users'], options['batch_size'])
+        group_ids = self.create_groups(options['groups'])
+        self.drop_indexes()
+        try:
+            self.create_posts(author_ids, group_ids, options, started)
+        finally:
+            self.restore_indexes()
+        call_command('rebuild_post_counters', stdout=self.stdout)
+        bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с'
+        ))
+
+    def random_date(self):
+        return str(self.since + timedelta(
+            seconds=self.random.random() * self.seconds
+        ))
+
+    def insert(self, model, columns, rows):
+        table = connection.ops.quote_name(model._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(columns))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'VALUES ({placeholders})',
+                rows,
+            )
+
+    def skewed(self, ids, skew):
+        """Перемешанные id и веса: самые активные не идут подряд по id."""
+        ids = list(ids)
+        self.random.shuffle(ids)
+        return ids, zipf_cum_weights(len(ids), skew)
+
+    def create_users(self, count, batch_size):
+        password = make_password(None)
+        for start, size in batches(count, batch_size):
+            with transaction.atomic():
+                self.insert(User, (
+                    'password', 'is_superuser', 'username', 'first_name',
+                    'last_name', 'email', 'is_staff', 'is_active',
+                    'date_joined',
+                ), [
+                    (
+                        password, False, f'{self.prefix}{number}',
+                        self.random.choice(FIRST_NAMES),
+                        self.random.choice(LAST_NAMES),
+                        f'{self.prefix}{number}@example.com',
+                        False, True, self.random_date(),
+                    )
+                    for number in range(start, start + size)
+                ])
+        self.stdout.write(f'Пользователей: {count}')
+        return User.objects.filter(
+            username__startswith=self.prefix
+        ).order_by('pk').values_list('pk', flat=True)
+
+    def create_groups(self, count):
+        with transaction.atomic():
+            self.insert(Group, ('title', 'slug', 'description'), [
+                (
+                    f'{self.random.choice(TOPICS)} {number}',
+                    f'{self.prefix}-{number}',
+                    self.sentence(5, 20),
+                )
+                for number in range(count)
+            ])
+        self.stdout.write(f'Групп: {count}')
+        return Group.objects.filter(
+            slug__startswith=self.prefix
+        ).order_by('pk').values_list('pk', flat=True)
+
+    def sentence(self, min_words, max_words):
+        words = self.random.choices(
+            WORDS, k=self.random.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize() + '.'
+
+    def texts(self, count):
+        """Тексты постов из готовых предложений: выбирать каждое слово
+        отдельно втрое дольше, чем вставлять строки в базу."""
+        return [
+            ' '.join(self.random.choices(
+                self.sentences, k=self.random.randint(1, 6)
+            ))
+            for _ in range(count)
+        ]
+
+    def create_posts(self, author_ids, group_ids, options, started):
+        self.sentences = [self.sentence(3, 10) for _ in range(SENTENCES)]
+        authors, author_weights = self.skewed(author_ids, options['skew'])
+        groups, group_weights = self.skewed(group_ids, options['skew'])
+        total = options['posts']
+        for start, size in batches(total, options['batch_size']):
+            post_authors = self.random.choices(
+                authors, cum_weights=author_weights, k=size
+            )
+            post_groups = self.random.choices(
+                groups, cum_weights=group_weights, k=size
+            ) if groups else [None] * size
+            rows = []
+            for text, author_id, group_id in zip(
+                self.texts(size), post_authors, post_groups
+            ):
+                if self.random.random() >= options['group_share']:
+                    group_id = None
+                pub_date = self.random_date()
+                rows.append((
+                    text, render_text(text), RENDER_VERSION,
+                    pub_date, pub_date, author_id, group_id,
+                ))
+            with transaction.atomic():
+                self.insert(Post, (
+                    'text', 'text_html', 'text_html_version', 'pub_date',
+                    'updated', 'author_id', 'group_id',
+                ), rows)
+            done = start + size
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'Постов: {done} из {total}, {rate:.0f}/с')
+
+    def drop_indexes(self):
+        """Индексы строятся один раз после загрузки, а не на каждую вставку."""
+        with connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                editor.remove_index(Post, index)
+            editor.execute(f'DROP TRIGGER {FTS_INSERT_TRIGGER}')
+
+    def restore_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                editor.add_index(Post, index)
+            editor.execute(FTS_INSERT_TRIGGER_SQL)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        with connection.cursor() as cursor:
+            # Свежая статистика нужна планировщику и EstimatedCount
+            cursor.execute('ANALYZE')
+        self.stdout.write('Индексы перестроены')
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+def normalized(column):
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+                "text, content='', "
+                "tokenize='unicode61 remove_diacritics 2')",
+                f"""
+                CREATE TRIGGER posts_post_fts_insert
+                AFTER INSERT ON posts_post BEGIN
+                    INSERT INTO posts_post_fts(rowid, text)
+                    VALUES (new.id, {normalized('new.text')});
+                END
+                """,
+                f"""
+                CREATE TRIGGER posts_post_fts_delete
+                AFTER DELETE ON posts_post BEGIN
+                    INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+                    VALUES ('delete', old.id, {normalized('old.text')});
+                END
+                """,
+                f"""
+                CREATE TRIGGER posts_post_fts_update
+                AFTER UPDATE OF text ON posts_post BEGIN
+                    INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+                    VALUES ('delete', old.id, {normalized('old.text')});
+                    INSERT INTO posts_post_fts(rowid, text)
+                    VALUES (new.id, {normalized('new.text')});
+                END
+                """,
+                "INSERT INTO posts_post_fts(rowid, text) "
+                f"SELECT id, {normalized('text')} FROM posts_post",
+            ],
+            reverse_sql=[
+                'DROP TRIGGER posts_post_fts_update',
+                'DROP TRIGGER posts_post_fts_delete',
+                'DROP TRIGGER posts_post_fts_insert',
+                'DROP TABLE posts_post_fts',
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+def normalized(column):
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+# SQLite добавляет столбцы пересозданием таблицы, вместе с ней пропадают
+# триггеры поискового индекса из 0005: их нужно создать заново.
+FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, {normalized('new.text')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {normalized('old.text')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {normalized('old.text')});
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, {normalized('new.text')});
+    END
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=migrations.RunSQL.noop,
+            reverse_sql=FTS_TRIGGERS,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст поста в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия оформления текста'),
+        ),
+        migrations.RunSQL(
+            sql=FTS_TRIGGERS,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
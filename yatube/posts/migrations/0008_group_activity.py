@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:17
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Значения posts.models.ACTIVITY_EPOCH и GROUP_ACTIVITY_HALF_LIFE на
+# момент миграции: их последующая смена не должна менять ее результат
+ACTIVITY_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = 30
+
+
+def activity_weight(pub_date):
+    days = (pub_date - ACTIVITY_EPOCH).total_seconds() / (24 * 60 * 60)
+    return 2 ** (days / HALF_LIFE)
+
+
+def fill_group_activity(apps, schema_editor):
+    """Строки статистики для всех групп, их рейтинг и дата последнего
+    поста: иначе /groups/ пуст или упорядочен неверно до ручного
+    rebuild_post_counters."""
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.filter(group__isnull=False).order_by()
+    counts = dict(posts.values_list('group').annotate(Count('pk')))
+    GroupStats.objects.bulk_create(
+        [
+            GroupStats(group_id=pk, posts_count=counts.get(pk, 0))
+            for pk in Group.objects.exclude(
+                pk__in=GroupStats.objects.values('pk')
+            ).values_list('pk', flat=True)
+        ],
+        batch_size=500,
+    )
+    activity = defaultdict(float)
+    latest = {}
+    for pk, pub_date in posts.values_list('group', 'pub_date').iterator():
+        activity[pk] += activity_weight(pub_date)
+        latest[pk] = max(latest.get(pk, pub_date), pub_date)
+    rows = list(GroupStats.objects.all())
+    for row in rows:
+        row.activity = activity.get(row.pk, 0)
+        row.last_post_date = latest.get(row.pk)
+    GroupStats.objects.bulk_update(
+        rows, ['activity', 'last_post_date'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupstats',
+            name='activity',
+            field=models.FloatField(default=0, verbose_name='Рейтинг активности'),
+        ),
+        migrations.AddField(
+            model_name='groupstats',
+            name='last_post_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста'),
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-activity'], name='groupstats_activity_idx'),
+        ),
+        migrations.RunPython(fill_group_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_group_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostImage',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='image', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('file', models.ImageField(upload_to='posts/', verbose_name='Картинка')),
+                ('thumbnails', models.TextField(blank=True, default='', editable=False, verbose_name='Адреса миниатюр')),
+            ],
+            options={
+                'verbose_name': 'Картинка поста',
+                'verbose_name_plural': 'Картинки постов',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+# Порог TIMELINE_CELEBRITY_FOLLOWERS на момент миграции
+CELEBRITY_FOLLOWERS = 10000
+
+
+def fill_celebrity(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gte=CELEBRITY_FOLLOWERS
+    ).update(celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Знаменитость'),
+        ),
+        migrations.RunPython(fill_celebrity, migrations.RunPython.noop),
+    ]
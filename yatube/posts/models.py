@@ -1,5 +1,17 @@
+import json
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+
+from .cache import FEEDS_GENERATION, POSTS_GENERATION, bump_generations
+from .rendering import (
+    EXCERPT_LENGTH, RENDER_VERSION, RENDERED_FIELDS, render_post, render_text,
+)
 
 User = get_user_model()
 
@@ -21,15 +33,112 @@ class Group(models.Model):
         return self.title
 
 
+# Поля, которые выводят карточки лент; ключ кэша карточки строится
+# по updated и text_html_version
+LIST_FIELDS = (
+    'pub_date', 'updated', 'text_html_version',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__slug',
+    'image', 'image__file', 'image__thumbnails',
+)
+
+# Начало текста для выдержки, см. PostQuerySet.for_list
+EXCERPT_SELECT = {'text_start': 'substr(posts_post.text, 1, %s)'}
+EXCERPT_PARAMS = (EXCERPT_LENGTH + 1,)
+
+
+class PostQuerySet(models.QuerySet):
+    # Массовые операции не посылают сигналы, поэтому сами обновляют
+    # счетчики и сбрасывают кэш всех лент сразу.
+    @staticmethod
+    def counted_fields():
+        return (('author', AuthorStats), ('group', GroupStats))
+
+    def for_list(self):
+        """Посты для лент: без полного текста и готового тела, только
+        начало текста на символ длиннее выдержки. По лишнему символу
+        видно, что пост в выдержку не поместился."""
+        # extra, а не annotate: с аннотацией count() пагинатора
+        # группирует таблицу в подзапросе и перестает брать индекс
+        return self.select_related('author', 'group', 'image').only(
+            *LIST_FIELDS
+        ).extra(select=EXCERPT_SELECT, select_params=EXCERPT_PARAMS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for post in objs:
+            render_post(post)
+        with transaction.atomic(using=self.db):
+            posts = super().bulk_create(objs, *args, **kwargs)
+            for field, stats in self.counted_fields():
+                pub_dates = defaultdict(list)
+                for post in posts:
+                    pub_dates[getattr(post, f'{field}_id')].append(
+                        post.pub_date
+                    )
+                for pk, dates in pub_dates.items():
+                    stats.objects.add_posts(pk, dates)
+        bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+        return posts
+
+    def update(self, **kwargs):
+        # auto_now не срабатывает в update(), а от updated зависит
+        # кэш карточек постов. Перерисовка тела правкой не считается.
+        if not RENDERED_FIELDS.issuperset(kwargs):
+            kwargs.setdefault('updated', timezone.now())
+        if isinstance(kwargs.get('text'), str):
+            kwargs['text_html'] = render_text(kwargs['text'])
+            kwargs['text_html_version'] = RENDER_VERSION
+        with transaction.atomic(using=self.db):
+            changed = [
+                (field, stats, list(
+                    self.order_by().values_list(field).annotate(
+                        models.Count('pk')
+                    )
+                ))
+                for field, stats in self.counted_fields()
+                if field in kwargs or f'{field}_id' in kwargs
+            ]
+            rows = super().update(**kwargs)
+            for field, stats, old_counts in changed:
+                for pk, count in old_counts:
+                    stats.objects.change_posts_count(pk, -count)
+                value = kwargs.get(field, kwargs.get(f'{field}_id'))
+                stats.objects.change_posts_count(
+                    getattr(value, 'pk', value), rows
+                )
+                if stats is GroupStats:
+                    GroupStats.objects.refresh_activity(
+                        [pk for pk, _ in old_counts]
+                        + [getattr(value, 'pk', value)]
+                    )
+        bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+        return rows
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста'
     )
+    text_html = models.TextField(
+        editable=False,
+        default='',
+        verbose_name='Текст поста в HTML'
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        editable=False,
+        default=0,
+        verbose_name='Версия оформления текста'
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         null=True,
@@ -47,8 +156,339 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('pub_date', 'id'), name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('group', 'pub_date'), name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', 'pub_date'), name='post_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+    def save(self, *args, **kwargs):
+        render_post(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+        # Счетчики обновляются сигналами в той же транзакции. Точка
+        # сохранения не нужна: при ошибке откатывается вся транзакция.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class StatsQuerySet(models.QuerySet):
+    def add_posts(self, pk, pub_dates):
+        self.change_posts(pk, pub_dates, 1)
+
+    def remove_posts(self, pk, pub_dates):
+        self.change_posts(pk, pub_dates, -1)
+
+    def change_posts(self, pk, pub_dates, sign):
+        self.change_posts_count(pk, sign * len(pub_dates))
+
+    def change_posts_count(self, pk, delta):
+        self.change_counter(pk, 'posts_count', delta, self.count_posts)
+
+    def change_followers_count(self, pk, delta):
+        self.change_counter(
+            pk, 'followers_count', delta,
+            lambda pk: Follow.objects.filter(author=pk).count(),
+        )
+
+    def change_counter(self, pk, field, delta, count):
+        if pk is None or not delta:
+            return
+        updated = self.filter(pk=pk).update(**{field: F(field) + delta})
+        if not updated:
+            self.get_or_create(pk=pk, defaults={field: count(pk)})
+
+    def count_posts(self, pk):
+        field = self.model._meta.pk.name
+        return Post.objects.filter(**{field: pk}).count()
+
+    def posts_count(self, pk):
+        count = self.filter(pk=pk).values_list(
+            'posts_count', flat=True
+        ).first()
+        if count is None:
+            return self.count_posts(pk)
+        return count
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    # Посты знаменитости не раскладываются по лентам, а подмешиваются при
+    # чтении. Признак хранится, а не считается по followers_count: см.
+    # posts.timeline.follower_added и follower_removed.
+    celebrity = models.BooleanField(
+        default=False,
+        verbose_name='Знаменитость'
+    )
+
+    objects = StatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class PostImage(models.Model):
+    """Картинка поста. Файл назван по хэшу содержимого, миниатюры
+    заранее строит make_thumbnails и сохраняет их адреса в thumbnails."""
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='image',
+        verbose_name='Пост'
+    )
+    file = models.ImageField(
+        upload_to='posts/',
+        verbose_name='Картинка'
+    )
+    # JSON {размер: адрес}; пустая строка — миниатюры еще не построены
+    thumbnails = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Адреса миниатюр'
+    )
+
+    class Meta:
+        verbose_name = 'Картинка поста'
+        verbose_name_plural = 'Картинки постов'
+
+    def __str__(self):
+        return self.file.name
+
+    @property
+    def urls(self):
+        return json.loads(self.thumbnails or '{}')
+
+
+# Рейтинг активности группы — сумма весов ее постов. Вес поста растет
+# вдвое каждые GROUP_ACTIVITY_HALF_LIFE дней от ACTIVITY_EPOCH: порядок
+# групп по такой сумме совпадает с порядком по активности, затухающей
+# вдвое за тот же срок, а саму сумму не нужно пересчитывать со временем.
+ACTIVITY_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def activity_weight(pub_date):
+    days = (pub_date - ACTIVITY_EPOCH).total_seconds() / (24 * 60 * 60)
+    return 2 ** (days / settings.GROUP_ACTIVITY_HALF_LIFE)
+
+
+def refresh_group_activity(posts, stats):
+    """Заполняет рейтинг и дату последнего поста строк stats по постам
+    posts."""
+    activity = defaultdict(float)
+    latest = {}
+    for pk, pub_date in posts.values_list('group', 'pub_date').iterator():
+        activity[pk] += activity_weight(pub_date)
+        latest[pk] = max(latest.get(pk, pub_date), pub_date)
+    rows = list(stats)
+    for row in rows:
+        row.activity = activity.get(row.pk, 0)
+        row.last_post_date = latest.get(row.pk)
+    stats.bulk_update(rows, ['activity', 'last_post_date'])
+
+
+class GroupStatsQuerySet(StatsQuerySet):
+    def change_posts(self, pk, pub_dates, sign):
+        """Счетчик, рейтинг и дата последнего поста одним UPDATE. Посты
+        уже записаны, удалены или перенесены, поэтому дата последнего
+        берется по индексу (group, pub_date)."""
+        if pk is None or not pub_dates:
+            return
+        updated = self.filter(pk=pk).update(
+            posts_count=F('posts_count') + sign * len(pub_dates),
+            activity=F('activity') + sign * sum(
+                map(activity_weight, pub_dates)
+            ),
+            last_post_date=Subquery(Post.objects.filter(group=pk).order_by(
+                '-pub_date'
+            ).values('pub_date')[:1]),
+        )
+        if not updated:
+            self.get_or_create(
+                pk=pk, defaults={'posts_count': self.count_posts(pk)}
+            )
+            self.refresh_activity([pk])
+
+    def refresh_activity(self, pks=None):
+        """Пересчитывает рейтинг и дату последнего поста по постам
+        групп pks или всех групп одним проходом по таблице постов."""
+        posts = Post.objects.filter(group__isnull=False).order_by()
+        stats = self.all()
+        if pks is not None:
+            pks = {pk for pk in pks if pk is not None}
+            posts = posts.filter(group__in=pks)
+            stats = stats.filter(pk__in=pks)
+        refresh_group_activity(posts, stats)
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    last_post_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата последнего поста'
+    )
+    activity = models.FloatField(
+        default=0,
+        verbose_name='Рейтинг активности'
+    )
+
+    objects = GroupStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+        indexes = (
+            models.Index(
+                fields=('-activity',), name='groupstats_activity_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.group_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~Q(user=F('author')), name='follow_not_self'
+            ),
+        )
+        # Раскладка поста обходит подписчиков автора по возрастанию id
+        indexes = (
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок читателя. Автор и дата копируются из поста,
+    чтобы лента читалась одним проходом по индексу."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class FanoutTask(models.Model):
+    """Недоразложенный пост автора с большим числом подписчиков.
+    cursor — id последнего подписчика, которому пост уже достался."""
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    cursor = models.IntegerField(
+        default=0,
+        verbose_name='Последний подписчик'
+    )
+
+    class Meta:
+        verbose_name = 'Раскладка поста'
+        verbose_name_plural = 'Раскладки постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.cursor}'
@@ -0,0 +1,35 @@
+from django.utils.html import linebreaks
+
+# Увеличивается при каждой смене правил оформления: render_posts
+# перерисует все посты с меньшей версией. 0 — тело еще не построено.
+RENDER_VERSION = 1
+
+# Поля, которые строятся из text и не считаются правкой поста
+RENDERED_FIELDS = frozenset({'text_html', 'text_html_version'})
+
+# Длина выдержки в карточках лент, символов. Она входит в ключ кэша
+# карточек, тела постов от нее не зависят.
+EXCERPT_LENGTH = 300
+
+
+def render_text(text):
+    """HTML тела поста: текст экранируется целиком, абзацы и переносы
+    строк оформляются как фильтром linebreaks."""
+    return linebreaks(text, autoescape=True)
+
+
+def render_post(post):
+    post.text_html = render_text(post.text)
+    post.text_html_version = RENDER_VERSION
+
+
+def render_excerpt(text):
+    """HTML выдержки и признак того, что текст обрезан."""
+    if len(text) <= EXCERPT_LENGTH:
+        return render_text(text), False
+    head = text[:EXCERPT_LENGTH]
+    words = head.rsplit(maxsplit=1)
+    if len(words) == 2 and not text[EXCERPT_LENGTH].isspace():
+        # Недописанное слово отбрасывается, если оно не единственное
+        head = words[0]
+    return render_text(head.rstrip() + '…'), True
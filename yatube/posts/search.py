@@ -0,0 +1,124 @@
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from .models import Post
+from .utils import KeysetPage, decode_token, encode_token
+
+# Индекс без своей копии текста: триггеры из миграции 0005 пишут в него
+# текст с заменой «ё» на «е», unicode61 сам не сводит их друг к другу.
+FTS_TABLE = 'posts_post_fts'
+
+# Триггер вставки из миграции 0005. Массовая загрузка снимает его и
+# перестраивает индекс одним запросом: построчно выходит в разы медленнее.
+FTS_INSERT_TRIGGER = 'posts_post_fts_insert'
+FTS_INSERT_TRIGGER_SQL = (
+    f'CREATE TRIGGER {FTS_INSERT_TRIGGER} AFTER INSERT ON posts_post BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, text) '
+    "VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')); END"
+)
+
+TERM_RE = re.compile(r'\w+')
+
+MATCHING_IDS_SQL = (
+    f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+)
+
+RANKED_SQL = (
+    'SELECT rowid, score FROM ('
+    f'SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s)'
+)
+
+
+def normalize_text(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def build_match_query(query):
+    """Каждое слово запроса ищется как префикс: «пост hel» -> пост*, hel*."""
+    return ' '.join(
+        f'"{term}"*' for term in TERM_RE.findall(normalize_text(query))
+    )
+
+
+def matching_post_ids(match):
+    return RawSQL(MATCHING_IDS_SQL, [match])
+
+
+def encode_search_cursor(post):
+    return encode_token(repr(post.search_score), post.pk)
+
+
+def decode_search_cursor(token):
+    try:
+        score, pk = decode_token(token)
+        return float(score), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+class SearchPaginator(Paginator):
+    """Keyset-пагинация результатов поиска по (bm25, id)."""
+
+    encode_cursor = staticmethod(encode_search_cursor)
+
+    def __init__(self, match, per_page, **kwargs):
+        super().__init__([], per_page, **kwargs)
+        self.match = match
+
+    @cached_property
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM ({MATCHING_IDS_SQL})', [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def fetch(self, condition, ordering, params):
+        sql = f'{RANKED_SQL} {condition} ORDER BY {ordering} LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.match, *params, self.per_page + 1])
+            rows = cursor.fetchall()
+        posts = Post.objects.for_list().in_bulk(
+            [pk for pk, _ in rows]
+        )
+        results = []
+        for pk, score in rows:
+            if pk in posts:
+                posts[pk].search_score = score
+                results.append(posts[pk])
+        return results
+
+    def get_keyset_page(self, after=None, before=None):
+        cursor = decode_search_cursor(before) if before else None
+        if cursor is not None:
+            score, pk = cursor
+            rows = self.fetch(
+                'WHERE score < %s OR (score = %s AND rowid < %s)',
+                'score DESC, rowid DESC',
+                [score, score, pk],
+            )
+            if rows:
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return KeysetPage(rows, self, True, has_previous)
+        cursor = decode_search_cursor(after) if after else None
+        if cursor is not None:
+            score, pk = cursor
+            rows = self.fetch(
+                'WHERE score > %s OR (score = %s AND rowid > %s)',
+                'score, rowid',
+                [score, score, pk],
+            )
+        else:
+            rows = self.fetch('', 'score, rowid', [])
+        return KeysetPage(
+            rows[:self.per_page],
+            self,
+            len(rows) > self.per_page,
+            cursor is not None,
+        )
@@ -0,0 +1,124 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .cache import (AUTHOR_GENERATION, FEEDS_GENERATION, GROUP_GENERATION,
+                    POSTS_GENERATION, bump_generations)
+from .models import (AuthorStats, Follow, Group, GroupStats, Post,
+                     PostQuerySet, User)
+from .timeline import follower_added, follower_removed
+
+# Поля автора, которые видны в карточках постов во всех лентах
+AUTHOR_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_init, sender=Post)
+def remember_initial_fields(sender, instance, **kwargs):
+    for field, _ in PostQuerySet.counted_fields():
+        setattr(
+            instance,
+            f'_initial_{field}_id',
+            instance.__dict__.get(f'{field}_id')
+        )
+
+
+def change_post_counters(post, created=False, deleted=False):
+    for field, stats in PostQuerySet.counted_fields():
+        current = getattr(post, f'{field}_id')
+        old = None if created else getattr(post, f'_initial_{field}_id')
+        new = current
+        if deleted:
+            old, new = current, None
+        if old != new:
+            stats.objects.remove_posts(old, [post.pub_date])
+            stats.objects.add_posts(new, [post.pub_date])
+
+
+def post_generations(post):
+    keys = [POSTS_GENERATION]
+    if post.group_id is not None:
+        keys.append(GROUP_GENERATION.format(post.group.slug))
+    initial_group_id = post._initial_group_id
+    if initial_group_id not in (None, post.group_id):
+        keys += [
+            GROUP_GENERATION.format(slug) for slug in
+            Group.objects.filter(pk=initial_group_id).values_list(
+                'slug', flat=True
+            )
+        ]
+    if post.author_id is not None:
+        keys.append(AUTHOR_GENERATION.format(post.author.username))
+    return keys
+
+
+@receiver(post_save, sender=Post)
+def on_post_save(sender, instance, created, **kwargs):
+    change_post_counters(instance, created=created)
+    bump_generations(*post_generations(instance))
+    remember_initial_fields(sender, instance)
+
+
+@receiver(post_delete, sender=Post)
+def on_post_delete(sender, instance, **kwargs):
+    change_post_counters(instance, deleted=True)
+    bump_generations(*post_generations(instance))
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_save(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.change_followers_count(instance.author_id, 1)
+        follower_added(instance.author_id)
+        bump_generations(AUTHOR_GENERATION.format(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_delete(sender, instance, **kwargs):
+    # При удалении автора подписки удаляются каскадом вместе с его
+    # статистикой, счетчик менять уже не у кого
+    username = User.objects.filter(pk=instance.author_id).values_list(
+        'username', flat=True
+    ).first()
+    if username is None:
+        return
+    AuthorStats.objects.change_followers_count(instance.author_id, -1)
+    follower_removed(instance.author_id)
+    bump_generations(AUTHOR_GENERATION.format(username))
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.create(author=instance)
+
+
+@receiver(post_init, sender=User)
+def remember_author_display(sender, instance, **kwargs):
+    instance._initial_display = [
+        instance.__dict__.get(field) for field in AUTHOR_DISPLAY_FIELDS
+    ]
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_author(sender, instance, created, update_fields=None,
+                              **kwargs):
+    # Вход пользователя сохраняет только last_login
+    if (update_fields is not None
+            and not set(AUTHOR_DISPLAY_FIELDS) & set(update_fields)):
+        return
+    initial = instance._initial_display
+    remember_author_display(sender, instance)
+    if not created and instance._initial_display != initial:
+        bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.create(group=instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def invalidate_all_feeds(sender, instance, **kwargs):
+    bump_generations(POSTS_GENERATION, FEEDS_GENERATION)
@@ -0,0 +1,36 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..cache import post_card_key
+from ..rendering import render_excerpt
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_context(post):
+    # Ленты загружают только начало текста, см. PostQuerySet.for_list
+    text = getattr(post, 'text_start', None)
+    if text is None:
+        text = post.text
+    excerpt, truncated = render_excerpt(text)
+    return {'post': post, 'excerpt': excerpt, 'truncated': truncated}
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов страницы: готовые берутся из кэша одним get_many."""
+    keys = {post_card_key(post): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, card_context(post))
+        for key, post in keys.items() if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,236 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.middleware.query_budget import record_queries
+from ..cache import (POSTS_GENERATION, bump_generations, get_generations,
+                     post_card_key)
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    """Кэш лент сбрасывается только для затронутых страниц."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other_author = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другая группа',
+            slug='another-slug',
+            description='Тестовое описание',
+        )
+        cls.unrelated_group = Group.objects.create(
+            title='Посторонняя группа',
+            slug='unrelated-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        Post.objects.create(
+            text='Пост другого автора',
+            author=cls.other_author,
+            group=cls.unrelated_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list',
+                             kwargs={'slug': self.group.slug}),
+            'another_group': reverse('posts:group_list',
+                                     kwargs={'slug': self.another_group.slug}),
+            'unrelated_group': reverse(
+                'posts:group_list',
+                kwargs={'slug': self.unrelated_group.slug}
+            ),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': self.author.username}),
+            'other_profile': reverse(
+                'posts:profile',
+                kwargs={'username': self.other_author.username}
+            ),
+        }
+
+    def is_cached(self, url):
+        with record_queries() as queries:
+            self.client.get(url)
+        return not queries
+
+    def warm_up(self):
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def test_guest_feeds_are_cached(self):
+        """Повторный запрос гостя не обращается к базе."""
+        self.warm_up()
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                self.assertTrue(self.is_cached(url))
+
+    def test_authorized_feeds_are_not_cached(self):
+        """Страницы для авторизованных пользователей не кэшируются."""
+        self.authorized_client.get(self.urls['index'])
+        response = self.authorized_client.get(self.urls['index'])
+        self.assertIsNotNone(response.context)
+
+    def test_post_create_invalidates_affected_feeds(self):
+        """Новый пост сразу виден в ленте после редиректа."""
+        self.warm_up()
+        text = 'Свежий пост'
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': text, 'group': self.group.pk},
+            follow=True,
+        )
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(name=name):
+                response = self.client.get(self.urls[name])
+                self.assertContains(response, text)
+        for name in ('unrelated_group', 'other_profile', 'another_group'):
+            with self.subTest(name=name):
+                self.assertTrue(self.is_cached(self.urls[name]))
+
+    def test_post_edit_invalidates_old_and_new_group(self):
+        """Перенос поста в другую группу сбрасывает обе группы."""
+        self.warm_up()
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Отредактированный пост',
+             'group': self.another_group.pk},
+        )
+        response = self.client.get(self.urls['group'])
+        self.assertNotContains(response, 'Отредактированный пост')
+        response = self.client.get(self.urls['another_group'])
+        self.assertContains(response, 'Отредактированный пост')
+        for name in ('unrelated_group', 'other_profile'):
+            with self.subTest(name=name):
+                self.assertTrue(self.is_cached(self.urls[name]))
+
+    def test_author_rename_invalidates_feeds(self):
+        """Смена имени автора сбрасывает ленты, вход — нет."""
+        self.warm_up()
+        author = User.objects.get(pk=self.author.pk)
+        author.last_login = author.date_joined
+        author.save(update_fields=['last_login'])
+        author.save()
+        self.assertTrue(self.is_cached(self.urls['index']))
+        author.first_name = 'Новое имя'
+        author.save()
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                self.assertFalse(self.is_cached(url))
+
+
+class GenerationCommitTests(TransactionTestCase):
+    """Поколения меняются и после фиксации транзакции."""
+    def test_bump_repeated_on_commit(self):
+        """Поколение, прочитанное до фиксации, после нее устаревает."""
+        cache.clear()
+        with transaction.atomic():
+            bump_generations(POSTS_GENERATION)
+            inside = get_generations([POSTS_GENERATION])
+        self.assertNotEqual(get_generations([POSTS_GENERATION]), inside)
+
+    def test_rolled_back_bump_not_repeated(self):
+        """После отката поколение второй раз не меняется."""
+        cache.clear()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                bump_generations(POSTS_GENERATION)
+                inside = get_generations([POSTS_GENERATION])
+                raise ValueError
+        self.assertEqual(get_generations([POSTS_GENERATION]), inside)
+
+
+class PostCardCacheTests(TestCase):
+    """Карточки постов кэшируются по id поста и времени изменения."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(text=f'Тестовый пост {i}', author=cls.author)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def card_keys(self):
+        return {
+            post.pk: post_card_key(post) for post in Post.objects.all()
+        }
+
+    def test_feed_caches_every_card(self):
+        """После рендера ленты карточки всех постов лежат в кэше."""
+        self.authorized_client.get(reverse('posts:index'))
+        keys = self.card_keys()
+        self.assertEqual(len(cache.get_many(keys.values())), len(keys))
+
+    def test_excerpt_length_in_card_key(self):
+        """Смена длины выдержки меняет ключи карточек без перерисовки
+        тел постов."""
+        post = Post.objects.get(pk=self.posts[0].pk)
+        key = post_card_key(post)
+        with mock.patch('posts.cache.EXCERPT_LENGTH', 100):
+            self.assertNotEqual(post_card_key(post), key)
+
+    def test_post_edit_invalidates_only_its_card(self):
+        """Редактирование поста сбрасывает только его карточку."""
+        self.authorized_client.get(reverse('posts:index'))
+        old_keys = self.card_keys()
+        edited = self.posts[0]
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': edited.pk}),
+            {'text': 'Отредактированный пост'},
+        )
+        new_keys = self.card_keys()
+        self.assertNotEqual(new_keys[edited.pk], old_keys[edited.pk])
+        for post in self.posts[1:]:
+            with self.subTest(post=post.pk):
+                self.assertEqual(new_keys[post.pk], old_keys[post.pk])
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный пост')
+        self.assertNotContains(response, edited.text)
+
+    def test_author_and_group_changes_invalidate_cards(self):
+        """Новое имя автора и адрес группы сразу видны в карточках."""
+        group = Group.objects.create(
+            title='Группа', slug='old-slug', description='Описание'
+        )
+        Post.objects.filter(pk=self.posts[0].pk).update(group=group)
+        self.client.get(reverse('posts:index'))
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        group.slug = 'new-slug'
+        group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое Имя')
+        self.assertContains(
+            response,
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}),
+        )
+        self.assertNotContains(
+            response,
+            reverse('posts:group_list', kwargs={'slug': 'old-slug'}),
+        )
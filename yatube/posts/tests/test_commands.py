@@ -0,0 +1,300 @@
+import gzip
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Group, GroupStats, Post
+from ..rendering import RENDER_VERSION, render_text
+from ..search import FTS_TABLE, SearchPaginator, build_match_query
+
+User = get_user_model()
+
+
+class ImportPostsCommandTests(TestCase):
+    """Команда import_posts."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.records = [
+            {'text': f'Импортированный пост {i}',
+             'author': 'author' if i % 2 else 'new_author',
+             'group': 'test-slug' if i % 3 else 'new-slug',
+             'pub_date': f'2015-01-{i + 1:02d}T10:00:00+00:00'}
+            for i in range(7)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_posts(self, path, *args):
+        call_command(
+            'import_posts', path, '--batch-size', '3', *args,
+            stdout=StringIO()
+        )
+
+    def test_import_jsonl(self):
+        """Посты из JSONL импортируются со своими датами и связями."""
+        path = self.write(
+            'posts.jsonl',
+            '\n'.join(json.dumps(record) for record in self.records)
+        )
+        self.import_posts(path)
+        self.assertEqual(Post.objects.count(), len(self.records))
+        post = Post.objects.get(text='Импортированный пост 0')
+        self.assertEqual(post.author.username, 'new_author')
+        self.assertEqual(post.group.slug, 'new-slug')
+        self.assertEqual(
+            post.pub_date.isoformat(), self.records[0]['pub_date']
+        )
+        self.assertEqual(
+            AuthorStats.objects.posts_count(self.author.pk), 3
+        )
+        self.assertEqual(GroupStats.objects.posts_count(self.group.pk), 4)
+
+    def test_import_csv(self):
+        """Посты импортируются из CSV."""
+        path = self.write(
+            'posts.csv',
+            'text,author,group,pub_date\n'
+            'Пост из CSV,author,,2015-01-01T10:00:00\n'
+        )
+        self.import_posts(path)
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Пост из CSV')
+        self.assertIsNone(post.group)
+        self.assertEqual(post.pub_date.year, 2015)
+
+    def test_import_resumes_from_checkpoint(self):
+        """С checkpoint повторный запуск продолжает с места остановки."""
+        path = self.write(
+            'posts.jsonl',
+            '\n'.join(json.dumps(record) for record in self.records)
+        )
+        checkpoint = self.write('checkpoint', '6')
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Импортированный пост 6']
+        )
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '7')
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_invalid_records_reported(self):
+        """Неверная дата и запись не-объект дают CommandError с номером."""
+        bad_date = dict(self.records[4], pub_date='2015-13-01T10:00:00')
+        cases = {
+            'Запись 5: pub_date': [*self.records[:4], bad_date],
+            'Запись 2: ожидается объект': [self.records[0], ['список']],
+        }
+        for message, records in cases.items():
+            with self.subTest(message=message):
+                path = self.write(
+                    'posts.jsonl',
+                    '\n'.join(json.dumps(record) for record in records)
+                )
+                with self.assertRaisesMessage(CommandError, message):
+                    self.import_posts(path)
+
+
+class ExportPostsTests(TestCase):
+    """Потоковая выгрузка постов командой и со страницы профиля."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(text='Пост «один»', author=cls.author)
+        Post.objects.create(
+            text='Пост, второй', author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Чужой пост', author=cls.reader)
+        cls.url = reverse(
+            'posts:profile_export', kwargs={'username': cls.author.username}
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_export_command_round_trip(self):
+        """Выгрузка export_posts снова загружается import_posts."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv.gz')
+            call_command('export_posts', path, '--format', 'csv', '--gzip')
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                exported = file.read()
+            Post.objects.all().delete()
+            plain_path = os.path.join(directory, 'posts.csv')
+            with open(plain_path, 'w', encoding='utf-8') as file:
+                file.write(exported)
+            call_command('import_posts', plain_path, stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('text', 'author__username',
+                                         'group__slug')),
+            {('Пост «один»', 'author', None),
+             ('Пост, второй', 'author', 'test-slug'),
+             ('Чужой пост', 'reader', None)}
+        )
+
+    def test_author_downloads_own_posts(self):
+        """Автор получает потоковую выгрузку своих постов."""
+        response = self.authorized_client.get(self.url)
+        self.assertTrue(response.streaming)
+        records = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(
+            [record['text'] for record in records],
+            ['Пост «один»', 'Пост, второй']
+        )
+
+    def test_gzip_export(self):
+        """?gzip сжимает выгрузку на лету."""
+        response = self.authorized_client.get(
+            self.url, {'format': 'csv', 'gzip': 1}
+        )
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(content.decode().startswith('text,author'))
+
+    def test_export_is_private(self):
+        """Гость и другой пользователь не могут выгрузить чужие посты."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class SeedCommandTests(TransactionTestCase):
+    """Команда seed: индексы снимаются DDL, поэтому без общей транзакции."""
+    def seed(self, prefix, seed=1):
+        call_command(
+            'seed', users=20, groups=3, posts=300, batch_size=100,
+            seed=seed, prefix=prefix, stdout=StringIO(),
+        )
+        return list(Post.objects.filter(
+            author__username__startswith=prefix
+        ).order_by('pk').values_list('text', 'pub_date'))
+
+    def test_seed_creates_consistent_data(self):
+        """Создаются посты, счетчики и поисковый индекс."""
+        self.seed('seed')
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        for stats, field in ((AuthorStats, 'author'), (GroupStats, 'group')):
+            for row in stats.objects.all():
+                with self.subTest(stats=stats, pk=row.pk):
+                    self.assertEqual(
+                        row.posts_count,
+                        Post.objects.filter(**{field: row.pk}).count()
+                    )
+        paginator = SearchPaginator(build_match_query('город'), 10)
+        self.assertGreater(paginator.count, 0)
+
+    def test_authors_are_skewed(self):
+        """У самых активных авторов заметно больше постов."""
+        self.seed('seed')
+        counts = sorted(
+            AuthorStats.objects.values_list('posts_count', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый --seed дает одинаковые посты."""
+        first = self.seed('first')
+        self.assertEqual(first, self.seed('second'))
+        self.assertNotEqual(first, self.seed('third', seed=2))
+
+    def test_post_indexes_restored(self):
+        """После загрузки индексы и триггер поиска на месте."""
+        self.seed('seed')
+        with connection.cursor() as cursor:
+            names = {
+                info.name for info in connection.introspection
+                .get_table_list(cursor)
+            }
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn(FTS_TABLE, names)
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, constraints)
+        Post.objects.create(text='Уникальноеслово', author=None)
+        self.assertEqual(
+            SearchPaginator(build_match_query('уникальноеслово'), 10).count, 1
+        )
+
+
+class RenderPostsCommandTests(TestCase):
+    """Команда render_posts дооформляет посты старых версий."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост\n{number}')
+            for number in range(5)
+        )
+
+    def test_outdated_posts_are_rendered(self):
+        """Перерисовываются только устаревшие посты, updated не меняется."""
+        stale = list(Post.objects.order_by('pk')[:3])
+        Post.objects.filter(pk__in=[post.pk for post in stale]).update(
+            text_html='', text_html_version=0
+        )
+        out = StringIO()
+        call_command('render_posts', batch_size=2, stdout=out)
+        self.assertIn(f'по версии {RENDER_VERSION}: 3', out.getvalue())
+        for post in stale:
+            fresh = Post.objects.get(pk=post.pk)
+            with self.subTest(pk=post.pk):
+                self.assertEqual(fresh.text_html, render_text(post.text))
+                self.assertEqual(fresh.text_html_version, RENDER_VERSION)
+                self.assertEqual(fresh.updated, post.updated)
+
+    def test_version_bump_rerenders_everything(self):
+        """Новая версия правил перерисовывает все посты."""
+        with mock.patch(
+            'posts.management.commands.render_posts.RENDER_VERSION',
+            RENDER_VERSION + 1,
+        ), mock.patch('posts.rendering.RENDER_VERSION', RENDER_VERSION + 1):
+            call_command('render_posts', stdout=StringIO())
+        self.assertEqual(
+            Post.objects.filter(text_html_version=RENDER_VERSION + 1).count(),
+            5
+        )
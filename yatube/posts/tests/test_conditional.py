@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.middleware.query_budget import record_queries
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """Страницы отвечают 304, пока их содержимое не менялось."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_pages_send_validators(self):
+        """Страницы отдают ETag, Last-Modified и Vary: Cookie."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_not_modified_without_page_queries(self):
+        """304 отдается без запросов к постам и рендера шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with record_queries() as queries:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                self.assertFalse(
+                    [sql for sql in queries if 'posts_groupstats' in sql
+                     or 'posts_authorstats' in sql
+                     or 'FROM "posts_group"' in sql]
+                )
+
+    def test_if_modified_since(self):
+        """Last-Modified работает и без ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.guest_client.get(url)['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        """Правка поста меняет ETag всех страниц с ним."""
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_post_changes_post_detail_etag(self):
+        """Новый пост автора меняет счетчик на странице другого поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(text='Еще пост', author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """ETag гостя не подходит авторизованному пользователю."""
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                guest_etag = self.guest_client.get(url)['ETag']
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=guest_etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(
+                    response['ETag'], reader_client.get(url)['ETag']
+                )
+
+    def test_missing_post_is_not_found(self):
+        """Для несуществующего поста по-прежнему 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
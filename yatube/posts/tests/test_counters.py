@@ -0,0 +1,230 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.middleware.query_budget import record_queries
+from ..models import (AuthorStats, Group, GroupStats, Post,
+                      activity_weight)
+from ..utils import preserve_auto_dates
+from .test_query_plans import bad_plan_steps, explain_query_plan
+
+User = get_user_model()
+
+
+class PostCountersTests(TestCase):
+    """Счетчики постов авторов и групп."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другая группа',
+            slug='another-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+
+    def assertCounts(self, author_count, group_count, another_group_count):
+        self.assertEqual(
+            AuthorStats.objects.posts_count(self.author.pk), author_count
+        )
+        self.assertEqual(
+            GroupStats.objects.posts_count(self.group.pk), group_count
+        )
+        self.assertEqual(
+            GroupStats.objects.posts_count(self.another_group.pk),
+            another_group_count
+        )
+
+    def test_post_create_increments_counters(self):
+        """Новый пост увеличивает счетчики автора и группы."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+        )
+        self.assertCounts(2, 2, 0)
+
+    def test_post_edit_moves_group_counter(self):
+        """Перенос поста в другую группу переносит и счетчик."""
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Тестовый пост', 'group': self.another_group.pk},
+        )
+        self.assertCounts(1, 0, 1)
+
+    def test_bulk_operations_keep_counters(self):
+        """bulk_create и update поддерживают счетчики."""
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i}', author=self.author, group=self.group)
+            for i in range(3)
+        ])
+        self.assertCounts(4, 4, 0)
+        Post.objects.filter(group=self.group).update(group=self.another_group)
+        self.assertCounts(4, 0, 4)
+        Post.objects.filter(author=self.author).update(author=None)
+        self.assertCounts(0, 0, 4)
+
+    def test_post_delete_decrements_counters(self):
+        """Удаление поста уменьшает счетчики."""
+        self.post.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_rebuild_command_fixes_counters(self):
+        """Команда rebuild_post_counters пересчитывает счетчики."""
+        AuthorStats.objects.update(posts_count=100)
+        GroupStats.objects.all().delete()
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounts(1, 1, 0)
+
+    def test_pages_do_not_count_posts(self):
+        """Профиль и пост берут число постов из счетчика."""
+        urls = [
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}) + '?page=1',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with record_queries() as queries:
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.context['posts_count'], 1)
+                self.assertFalse(
+                    [sql for sql in queries if 'COUNT(' in sql], queries
+                )
+
+
+class GroupDirectoryTests(TestCase):
+    """Каталог групп читает статистику, которую ведут записи постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.quiet, cls.busy, cls.empty = [
+            Group.objects.create(
+                title=f'Группа {slug}', slug=slug, description=''
+            )
+            for slug in ('quiet', 'busy', 'empty')
+        ]
+        with preserve_auto_dates(Post):
+            Post.objects.bulk_create(
+                Post(
+                    author=cls.author, group=cls.quiet, text='Давний пост',
+                    pub_date=timezone.now() - timedelta(days=365 + number),
+                    updated=timezone.now(),
+                )
+                for number in range(5)
+            )
+        Post.objects.create(author=cls.author, group=cls.busy, text='Новый')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertActivityEqual(self, first, second):
+        # Веса растут экспоненциально, сравнивать можно только
+        # относительно веса свежего поста
+        self.assertAlmostEqual(
+            first, second, delta=activity_weight(timezone.now()) * 1e-9
+        )
+
+    def stats(self):
+        return {
+            row.pk: (row.posts_count, row.last_post_date, row.activity)
+            for row in GroupStats.objects.all()
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.stats()
+        GroupStats.objects.refresh_activity()
+        for pk, (count, last, activity) in self.stats().items():
+            with self.subTest(pk=pk):
+                self.assertEqual(incremental[pk][:2], (count, last))
+                self.assertActivityEqual(incremental[pk][2], activity)
+
+    def test_migration_fills_activity(self):
+        """Миграция 0008 заполняет статистику групп, в том числе
+        недостающие строки, так же, как пересчет."""
+        expected = self.stats()
+        GroupStats.objects.filter(pk=self.busy.pk).delete()
+        GroupStats.objects.update(activity=0, last_post_date=None)
+        migration = import_module('posts.migrations.0008_group_activity')
+        migration.fill_group_activity(apps, None)
+        filled = self.stats()
+        self.assertEqual(filled.keys(), expected.keys())
+        for pk, (count, last, activity) in expected.items():
+            with self.subTest(pk=pk):
+                self.assertEqual(filled[pk][:2], (count, last))
+                self.assertActivityEqual(filled[pk][2], activity)
+
+    def test_writes_keep_stats_in_sync(self):
+        """Создание, перенос, массовая правка и удаление постов ведут
+        статистику так же, как полный пересчет."""
+        post = Post.objects.create(
+            author=self.author, group=self.busy, text='Еще один'
+        )
+        self.assertMatchesRebuild()
+        post.group = self.empty
+        post.save()
+        self.assertMatchesRebuild()
+        Post.objects.filter(group=self.empty).update(group=self.quiet)
+        self.assertMatchesRebuild()
+        Post.objects.filter(group=self.busy).delete()
+        self.assertMatchesRebuild()
+        self.assertIsNone(
+            GroupStats.objects.get(pk=self.busy.pk).last_post_date
+        )
+
+    def test_directory_ranks_recent_activity(self):
+        """Группа с одним свежим постом выше группы со старыми постами."""
+        response = self.client.get(reverse('posts:group_index'))
+        groups = [stats.group for stats in response.context['page_obj']]
+        self.assertEqual(groups, [self.busy, self.quiet, self.empty])
+        self.assertContains(response, reverse(
+            'posts:group_list', args=[self.busy.slug]
+        ))
+
+    def test_directory_does_not_scan_posts(self):
+        """Каталог не обращается к таблице постов и не сортирует."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:group_index'))
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('posts_post', query['sql'])
+        stats_sql = next(
+            query['sql'] for query in queries
+            if 'FROM "posts_groupstats"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        )
+        self.assertEqual(bad_plan_steps(explain_query_plan(stats_sql)), [])
+
+    def test_rebuild_command_restores_activity(self):
+        """rebuild_post_counters пересчитывает рейтинг и даты."""
+        expected = self.stats()
+        GroupStats.objects.update(activity=0, last_post_date=None)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        for pk, (count, last, activity) in self.stats().items():
+            with self.subTest(pk=pk):
+                self.assertEqual(expected[pk][:2], (count, last))
+                self.assertActivityEqual(expected[pk][2], activity)
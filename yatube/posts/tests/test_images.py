@@ -0,0 +1,201 @@
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from ..images import store_image, thumbnail_name
+from ..models import Post, PostImage
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload(name='picture.png', color='red', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PostImageTests(TestCase):
+    """Картинки постов и заранее построенные миниатюры."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def create_post(self, text, image):
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': text, 'image': image}
+        )
+        return Post.objects.get(text=text)
+
+    def test_images_are_stored_by_content_hash(self):
+        """Одинаковые картинки хранятся одним файлом с именем из хэша."""
+        first = self.create_post('Первый', image_upload('one.png'))
+        second = self.create_post('Второй', image_upload('two.png'))
+        other = self.create_post('Третий', image_upload(color='blue'))
+        self.assertEqual(first.image.file.name, second.image.file.name)
+        self.assertNotEqual(first.image.file.name, other.image.file.name)
+        self.assertRegex(
+            first.image.file.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.png$'
+        )
+        self.assertEqual(first.image.thumbnails, '')
+
+    def test_not_an_image_is_rejected(self):
+        """Файл, который не является картинкой, форма не принимает."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {
+                'text': 'Пост',
+                'image': SimpleUploadedFile('text.png', b'not an image'),
+            },
+        )
+        self.assertTrue(response.context['image_form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_thumbnails_are_built_by_worker_pool(self):
+        """make_thumbnails строит все размеры и сохраняет их адреса."""
+        post = self.create_post('Пост', image_upload())
+        broken = self.create_post('Битый', image_upload(color='green'))
+        default_storage.delete(broken.image.file.name)
+        default_storage.save(broken.image.file.name, BytesIO(b'broken'))
+        with self.settings(POST_THUMBNAIL_SIZES={'card': (300, 100)}):
+            call_command(
+                'make_thumbnails', workers=2,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        image = PostImage.objects.get(pk=post.pk)
+        name = thumbnail_name(image.file.name, (300, 100))
+        self.assertEqual(image.urls, {'card': default_storage.url(name)})
+        with default_storage.open(name) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (300, 100))
+        self.assertEqual(
+            json.loads(PostImage.objects.get(pk=broken.pk).thumbnails), {}
+        )
+
+    def test_image_replaced_during_build_stays_pending(self):
+        """Миниатюры старой картинки не записываются поверх новой."""
+        post = self.create_post('Пост', image_upload())
+        new_name = store_image(image_upload(color='blue'))
+
+        class ReplacingPool(ThreadPoolExecutor):
+            def map(self, fn, *iterables):
+                results = list(super().map(fn, *iterables))
+                PostImage.objects.filter(pk=post.pk).update(file=new_name)
+                return results
+
+        with mock.patch(
+            'posts.management.commands.make_thumbnails.ProcessPoolExecutor',
+            ReplacingPool,
+        ):
+            call_command('make_thumbnails', stdout=StringIO())
+        self.assertEqual(PostImage.objects.get(pk=post.pk).thumbnails, '')
+        call_command('make_thumbnails', stdout=StringIO())
+        image = PostImage.objects.get(pk=post.pk)
+        self.assertEqual(image.file.name, new_name)
+        self.assertTrue(image.urls)
+
+    def test_pages_use_stored_urls_without_storage_access(self):
+        """Ленты и страница поста выводят готовые адреса миниатюр
+        и не обращаются к хранилищу."""
+        post = self.create_post('Пост с картинкой', image_upload())
+        PostImage.objects.filter(pk=post.pk).update(thumbnails=json.dumps({
+            'card': '/media/thumbs/card.jpg',
+            'detail': '/media/thumbs/detail.jpg',
+        }))
+        pages = {
+            reverse('posts:index'): '/media/thumbs/card.jpg',
+            reverse('posts:profile', args=[self.author.username]):
+                '/media/thumbs/card.jpg',
+            reverse('posts:post_detail', args=[post.pk]):
+                '/media/thumbs/detail.jpg',
+        }
+        forbidden = mock.Mock(side_effect=AssertionError('обращение к файлу'))
+        with mock.patch.multiple(
+            FileSystemStorage, exists=forbidden, open=forbidden,
+            size=forbidden, path=forbidden,
+        ):
+            for url, thumbnail in pages.items():
+                with self.subTest(url=url):
+                    self.assertContains(self.client.get(url), thumbnail)
+
+    def test_pending_image_shows_original(self):
+        """Пока миниатюр нет, показывается исходная картинка."""
+        post = self.create_post('Пост', image_upload())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.file.url)
+
+    def test_edit_replaces_image(self):
+        """При правке поста картинку можно заменить."""
+        post = self.create_post('Пост', image_upload())
+        old_name = post.image.file.name
+        PostImage.objects.filter(pk=post.pk).update(thumbnails='{}')
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'image': image_upload(color='blue')},
+        )
+        image = PostImage.objects.get(pk=post.pk)
+        self.assertNotEqual(image.file.name, old_name)
+        self.assertEqual(image.thumbnails, '')
+
+
+# Повтор транзакции — лишние запросы сверх бюджета страницы
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, DB_WRITE_RETRY_ATTEMPTS=3, DB_WRITE_RETRY_DELAY=0,
+    QUERY_BUDGET_ENFORCE=False,
+)
+class PostImageRetryTests(TransactionTestCase):
+    """Повтор транзакции создания поста не пишет файл заново."""
+    def test_locked_create_retries_only_writes(self):
+        """При блокировке базы повторяются только записи в базу."""
+        self.addCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+        author = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(author)
+        calls = []
+
+        def fan_out(post):
+            calls.append(post)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+
+        with mock.patch('posts.views.fan_out', fan_out), mock.patch(
+            'posts.views.store_image', wraps=store_image
+        ) as store:
+            response = client.post(
+                reverse('posts:post_create'),
+                {'text': 'Пост', 'image': image_upload()},
+            )
+        self.assertRedirects(
+            response,
+            reverse('posts:profile', kwargs={'username': author.username}),
+        )
+        self.assertEqual(len(calls), 2)
+        store.assert_called_once()
+        post = Post.objects.get()
+        self.assertTrue(default_storage.exists(post.image.file.name))
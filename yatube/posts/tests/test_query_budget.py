@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.query_budget import QueryBudgetExceeded
+from ..models import Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Страницы укладываются в объявленный бюджет SQL-запросов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        ])
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_pages_within_query_budget(self):
+        """Число запросов не растет вместе с числом постов на странице."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}) + '?page=2',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            for client in (self.client, self.authorized_client):
+                with self.subTest(url=url, client=client):
+                    self.assertWithinQueryBudget(client, url)
+
+    def test_post_create_within_query_budget(self):
+        """Создание поста укладывается в бюджет."""
+        self.assertWithinQueryBudget(
+            self.authorized_client,
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+            method='post',
+        )
+
+    @override_settings(QUERY_BUDGETS={'posts:post_edit': 1})
+    def test_exceeded_budget_lists_duplicated_sql(self):
+        """Превышение бюджета падает и показывает повторяющийся SQL."""
+        another_group = Group.objects.create(
+            title='Другая группа',
+            slug='another-slug',
+            description='Тестовое описание',
+        )
+        with self.assertRaises(QueryBudgetExceeded) as error:
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+                {'text': 'Перенесенный пост', 'group': another_group.pk},
+            )
+        self.assertIn('2 x UPDATE "posts_groupstats"', str(error.exception))
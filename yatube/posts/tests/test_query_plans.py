@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+POST_TABLE = Post._meta.db_table
+
+
+def explain_query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_plan_steps(plan):
+    """Шаги плана с полным проходом по posts_post или временной сортировкой."""
+    return [
+        step for step in plan
+        if 'USE TEMP B-TREE' in step
+        or step.strip() == f'SCAN {POST_TABLE}'
+        or step.startswith(f'SCAN TABLE {POST_TABLE}')
+        and 'INDEX' not in step
+    ]
+
+
+class FeedQueryPlanTests(TestCase):
+    """Запросы лент из posts/views.py идут по индексам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        ])
+        cls.post = Post.objects.first()
+
+    def feed_urls(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+        paged_urls = []
+        for url in urls:
+            page_obj = self.client.get(url).context['page_obj']
+            paged_urls += [
+                url,
+                f'{url}?page=2',
+                f'{url}?after={page_obj.next_cursor}',
+                f'{url}?before={page_obj.next_cursor}',
+            ]
+        return paged_urls + [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_feed_queries_use_indexes(self):
+        """Ни один запрос ленты не сканирует таблицу и не сортирует."""
+        for url in self.feed_urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if (f'"{POST_TABLE}"' not in sql
+                        or not sql.startswith('SELECT')):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    plan = explain_query_plan(sql)
+                    self.assertEqual(bad_plan_steps(plan), [], plan)
@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..rendering import (
+    EXCERPT_LENGTH, RENDER_VERSION, render_excerpt, render_text,
+)
+
+User = get_user_model()
+
+
+class PostRenderingTests(TestCase):
+    """HTML тела поста строится при записи, а не при каждом показе."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Первый абзац\nс переносом\n\n<script>alert(1)</script>',
+        )
+
+    def test_text_is_escaped_and_split_into_paragraphs(self):
+        """Разметка из текста экранируется, абзацы оформляются."""
+        self.assertEqual(
+            self.post.text_html,
+            '<p>Первый абзац<br>с переносом</p>\n\n'
+            '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>'
+        )
+        self.assertEqual(self.post.text_html_version, RENDER_VERSION)
+
+    def test_edits_rerender_body(self):
+        """save(update_fields) и update() перестраивают тело с текстом."""
+        post = Post.objects.create(author=self.user, text='Было')
+        post.text = 'Стало'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Стало</p>')
+        Post.objects.filter(pk=post.pk).update(text='Еще раз')
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Еще раз</p>')
+
+    def test_bulk_create_renders_bodies(self):
+        """bulk_create строит тела всех постов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(3)
+        )
+        self.assertFalse(
+            Post.objects.exclude(text_html_version=RENDER_VERSION).exists()
+        )
+
+    def test_views_show_stored_body(self):
+        """Пост выводит сохраненное тело, а не оформляет текст заново."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        Post.objects.filter(pk=post.pk).update(
+            text_html='<p>Готовое тело</p>'
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, '<p>Готовое тело</p>', html=True)
+
+    def test_unrendered_post_falls_back_to_text(self):
+        """Пост без готового тела показывается из исходного текста."""
+        post = Post.objects.create(author=self.user, text='Старый <b>пост')
+        Post.objects.filter(pk=post.pk).update(
+            text_html='', text_html_version=0
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, render_text(post.text), html=True)
+
+
+class PostExcerptTests(TestCase):
+    """Ленты показывают выдержку и не загружают полный текст."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.long_post = Post.objects.create(
+            author=cls.user, text='Слово ' * EXCERPT_LENGTH + 'Финал'
+        )
+        cls.short_post = Post.objects.create(
+            author=cls.user, text='Короткий пост'
+        )
+
+    def test_excerpt_cuts_on_word_boundary(self):
+        """Выдержка обрезается по границе слова и помечается многоточием."""
+        excerpt, truncated = render_excerpt('абв ' * EXCERPT_LENGTH)
+        self.assertTrue(truncated)
+        self.assertTrue(excerpt.endswith('абв…</p>'))
+        self.assertEqual(
+            render_excerpt('Короткий пост'), ('<p>Короткий пост</p>', False)
+        )
+
+    def test_feed_shows_excerpt_and_read_more(self):
+        """Длинный пост в ленте обрезан и ведет на свою страницу."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Финал')
+        self.assertContains(response, 'Читать дальше', count=1)
+        self.assertContains(response, reverse(
+            'posts:post_detail', args=[self.long_post.pk]
+        ))
+        self.assertContains(response, 'Короткий пост')
+
+    def test_feed_query_skips_full_text(self):
+        """Запрос ленты не выбирает полный текст и готовое тело."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        selects = [
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+            and 'LIMIT' in query['sql']
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(sql=sql):
+                self.assertNotIn('"posts_post"."text"', sql)
+                self.assertNotIn('"text_html"', sql)
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import FTS_TABLE
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    """Полнотекстовый поиск по постам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.russian_post = Post.objects.create(
+            text='Новогодняя ёлка во дворе', author=cls.author
+        )
+        cls.english_post = Post.objects.create(
+            text='Searching for Django posts', author=cls.author
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'] or [])
+
+    def test_prefix_search_in_russian_and_english(self):
+        """Поиск по началу слова на русском и английском."""
+        cases = {
+            'ёлк': [self.russian_post],
+            'елка': [self.russian_post],
+            'НОВОГОД': [self.russian_post],
+            'search djan': [self.english_post],
+            'кошка': [],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+
+    def test_empty_result_message(self):
+        """Без совпадений показывается «Ничего не найдено.»."""
+        response = self.client.get(reverse('posts:search'), {'q': 'zzzqqq'})
+        self.assertContains(response, 'Ничего не найдено.')
+        response = self.client.get(reverse('posts:search'))
+        self.assertNotContains(response, 'Ничего не найдено.')
+
+    def test_index_follows_edits_and_deletes(self):
+        """Триггеры обновляют индекс при изменении и удалении поста."""
+        post = Post.objects.get(pk=self.russian_post.pk)
+        post.text = 'Весенний сад'
+        post.save()
+        self.assertEqual(self.search('ёлка'), [])
+        self.assertEqual(self.search('весен'), [post])
+        post.delete()
+        self.assertEqual(self.search('весен'), [])
+
+    def test_results_are_ranked_and_keyset_paginated(self):
+        """Результаты ранжируются и листаются курсорами."""
+        Post.objects.bulk_create([
+            Post(text=f'Рецепт пирога номер {i}', author=self.author)
+            for i in range(settings.POSTS_PER_PAGE + 2)
+        ])
+        best = Post.objects.create(
+            text='Пирог, пирог и еще раз пирог', author=self.author
+        )
+        url = reverse('posts:search')
+        first_page = self.client.get(url, {'q': 'пирог'}).context['page_obj']
+        self.assertEqual(first_page[0], best)
+        self.assertTrue(first_page.has_next())
+        second_page = self.client.get(
+            url, {'q': 'пирог', 'after': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(set(first_page) & set(second_page))
+        back_page = self.client.get(
+            url, {'q': 'пирог', 'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через полнотекстовый индекс."""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'елк'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].queryset), [self.russian_post]
+        )
+
+    def test_rebuild_command_backfills_index(self):
+        """rebuild_search_index заново заполняет индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        self.assertEqual(self.search('ёлка'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('ёлка'), [self.russian_post])
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.slow_queries import fingerprint, record_slow_queries
+from ..models import Group, Post
+
+User = get_user_model()
+
+RECORDER = 'posts.tests.test_slow_queries.ListRecorder'
+
+
+class ListRecorder:
+    slow = []
+    repeated = []
+
+    def record_slow(self, view_name, query):
+        self.slow.append((view_name, query))
+
+    def record_repeated(self, view_name, queries):
+        self.repeated.extend((view_name, query) for query in queries)
+
+
+@override_settings(SLOW_QUERY_RECORDERS=[RECORDER])
+class SlowQueryTests(TestCase):
+    """Медленные и повторяющиеся запросы указывают на место вызова."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'slug-{i}', description=''
+            )
+            for i in range(3)
+        ]
+        for group in cls.groups:
+            Post.objects.create(text='Пост', author=cls.author, group=group)
+
+    def setUp(self):
+        ListRecorder.slow.clear()
+        ListRecorder.repeated.clear()
+
+    def test_lazy_lookup_points_to_template_line(self):
+        """Ленивое post.group.slug в цикле указывает на строку шаблона."""
+        template = engines['django'].from_string(
+            '{% for post in posts %}\n'
+            '<p>{{ post.text }}</p>\n'
+            '<a href="/group/{{ post.group.slug }}/">группа</a>\n'
+            '{% endfor %}'
+        )
+        with record_slow_queries('posts:profile'):
+            template.render({'posts': Post.objects.all()})
+        [(view_name, query)] = ListRecorder.repeated
+        self.assertEqual(view_name, 'posts:profile')
+        self.assertEqual(query['count'], 3)
+        self.assertEqual(query['location'], '<unknown source>:3')
+        self.assertIn('posts_group', query['sql'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_has_params_and_code_line(self):
+        """Медленный запрос записывается с параметрами и строкой кода."""
+        with record_slow_queries('posts:index'):
+            list(Post.objects.filter(text='Искомый текст'))
+        [(view_name, query)] = ListRecorder.slow
+        self.assertEqual(view_name, 'posts:index')
+        self.assertIn('Искомый текст', query['params'])
+        self.assertTrue(
+            query['location'].startswith('posts/tests/test_slow_queries.py:')
+        )
+
+    @override_settings(SLOW_QUERY_REPEAT_THRESHOLD=2)
+    def test_middleware_records_view_name(self):
+        """Middleware передает имя представления и место в коде."""
+        self.client.force_login(self.author)
+        post = Post.objects.filter(group=self.groups[0]).get()
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Пост', 'group': self.groups[1].pk},
+        )
+        locations = {
+            query['location'] for view_name, query in ListRecorder.repeated
+            if view_name == 'posts:post_edit'
+            and 'posts_groupstats' in query['sql']
+        }
+        self.assertEqual(len(locations), 1)
+        self.assertTrue(locations.pop().startswith('posts/models.py:'))
+
+    def test_fingerprint_ignores_in_list_length(self):
+        """Списки IN разной длины дают один отпечаток."""
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (%s)'),
+            fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+        )
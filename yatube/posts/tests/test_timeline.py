@@ -0,0 +1,206 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, FanoutTask, Follow, Post, TimelineEntry
+from .test_query_plans import bad_plan_steps, explain_query_plan
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+ENTRY_TABLE = TimelineEntry._meta.db_table
+
+
+class TimelineTests(QueryBudgetMixin, TestCase):
+    """Подписки и лента подписок с раскладкой постов при записи."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+        cls.reader = cls.readers[0]
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def follow(self, reader, author=None):
+        author = author or self.author
+        return self.client_for(reader).post(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+
+    def create_post(self, text):
+        self.client_for(self.author).post(
+            reverse('posts:post_create'), {'text': text}
+        )
+        return Post.objects.get(text=text)
+
+    def timeline(self, reader, **params):
+        return self.client_for(reader).get(
+            reverse('posts:follow_index'), params
+        ).context['page_obj']
+
+    def followers_count(self):
+        return AuthorStats.objects.get(pk=self.author.pk).followers_count
+
+    def test_follow_and_unfollow(self):
+        """Подписка заполняет ленту старыми постами, отписка ее чистит."""
+        self.follow(self.reader)
+        self.follow(self.reader)
+        self.assertEqual(self.followers_count(), 1)
+        self.assertEqual(list(self.timeline(self.reader)), [self.old_post])
+        self.client_for(self.reader).post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.followers_count(), 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя, подписка только POST-запросом."""
+        self.follow(self.author)
+        self.assertFalse(Follow.objects.exists())
+        response = self.client_for(self.reader).get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 405)
+
+    def test_new_post_is_fanned_out_inline(self):
+        """Пост автора с немногими подписчиками сразу попадает в ленты."""
+        for reader in self.readers:
+            self.follow(reader)
+        post = self.create_post('Новый пост')
+        for reader in self.readers:
+            with self.subTest(reader=reader):
+                self.assertEqual(self.timeline(reader)[0], post)
+        self.assertFalse(FanoutTask.objects.exists())
+        self.assertEqual(list(self.timeline(self.author)), [])
+
+    @override_settings(TIMELINE_INLINE_FANOUT=1)
+    def test_large_fan_out_is_deferred_and_chunked(self):
+        """Большую раскладку делает fanout_timelines пачками."""
+        for reader in self.readers:
+            self.follow(reader)
+        post = self.create_post('Пост для многих')
+        self.assertTrue(FanoutTask.objects.filter(post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        out = StringIO()
+        call_command('fanout_timelines', batch_size=2, stdout=out)
+        self.assertIn(f'Пост {post.pk}: 3 пачек', out.getvalue())
+        self.assertFalse(FanoutTask.objects.exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), len(self.readers)
+        )
+
+    def test_celebrity_posts_are_pulled(self):
+        """Посты знаменитости не раскладываются, а подмешиваются при
+        чтении; страницы ленты не теряют и не повторяют посты."""
+        other = User.objects.create_user(username='other')
+        self.follow(self.reader)
+        self.follow(self.reader, other)
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for number in range(12) for author in (self.author, other)
+        )
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=self.reader, post=post, author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for post in Post.objects.filter(author=other)
+        )
+        AuthorStats.objects.filter(pk__in=[self.author.pk, other.pk]).update(
+            celebrity=True
+        )
+        post = self.create_post('Пост знаменитости')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        seen = []
+        page_obj = self.timeline(self.reader)
+        while True:
+            seen += [post.pk for post in page_obj]
+            if not page_obj.has_next():
+                break
+            page_obj = self.timeline(
+                self.reader, after=page_obj.next_cursor
+            )
+        previous = self.timeline(
+            self.reader, before=page_obj.previous_cursor
+        )
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual([post.pk for post in previous], seen[10:20])
+
+    # Раскладка постов бывшей знаменитости в бюджет отписки не входит
+    @override_settings(
+        TIMELINE_CELEBRITY_FOLLOWERS=3,
+        TIMELINE_CELEBRITY_EXIT_FOLLOWERS=2,
+        QUERY_BUDGET_ENFORCE=False,
+    )
+    def test_celebrity_transitions(self):
+        """Знаменитостью автор становится на первом пороге, перестает —
+        ниже второго; тогда его посты раскладываются заново."""
+        for reader in self.readers[:3]:
+            self.follow(reader)
+        self.assertTrue(AuthorStats.objects.get(pk=self.author.pk).celebrity)
+        post = self.create_post('Пост знаменитости')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.timeline(self.reader)[0], post)
+        for reader, celebrity in ((self.readers[2], True),
+                                  (self.readers[1], False)):
+            self.client_for(reader).post(
+                reverse('posts:profile_unfollow', args=[self.author.username])
+            )
+            with self.subTest(followers=self.followers_count()):
+                self.assertEqual(
+                    AuthorStats.objects.get(pk=self.author.pk).celebrity,
+                    celebrity
+                )
+        self.assertTrue(FanoutTask.objects.filter(post=post).exists())
+        call_command('fanout_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(post=post).values_list(
+                'user', flat=True
+            )),
+            [self.reader.pk]
+        )
+        self.assertEqual(self.timeline(self.reader)[0], post)
+
+    def test_timeline_is_an_index_range_scan(self):
+        """Лента читается по индексу записей без сортировки."""
+        self.follow(self.reader)
+        for number in range(12):
+            self.create_post(f'Пост {number}')
+        cursor = self.timeline(self.reader).next_cursor
+        url = reverse('posts:follow_index')
+        for page_url in (
+            url, f'{url}?after={cursor}', f'{url}?before={cursor}'
+        ):
+            with self.subTest(url=page_url):
+                self.assertWithinQueryBudget(
+                    self.client_for(self.reader), page_url
+                )
+        with CaptureQueriesContext(connection) as queries:
+            self.timeline(self.reader, after=cursor)
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{ENTRY_TABLE}"' in query['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        plan = explain_query_plan(selects[0])
+        self.assertIn('timeline_user_pub_date_idx', ' '.join(plan))
+        self.assertEqual(bad_plan_steps(plan), [])
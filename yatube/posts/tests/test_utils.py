@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from core.middleware.query_budget import record_queries
+from ..models import AuthorStats, Post
+from ..utils import (CachedCount, EstimatedCount, KeysetPaginator, StatsCount,
+                     exact_count)
+
+User = get_user_model()
+
+
+class CountStrategyTests(TestCase):
+    """Стратегии подсчета постов для пагинатора."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Тестовый пост {i}')
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator_count(self, count_strategy):
+        return KeysetPaginator(Post.objects.all(), 2, count_strategy).count
+
+    def test_exact_count(self):
+        """По умолчанию пагинатор считает посты через COUNT(*)."""
+        self.assertEqual(self.paginator_count(exact_count), 5)
+
+    def test_cached_count_hits_database_once(self):
+        """CachedCount повторно берет число из кэша."""
+        self.assertEqual(self.paginator_count(CachedCount()), 5)
+        with record_queries() as queries:
+            self.assertEqual(self.paginator_count(CachedCount()), 5)
+        self.assertEqual(queries, [])
+
+    def test_stats_count(self):
+        """StatsCount читает счетчик автора."""
+        AuthorStats.objects.filter(pk=self.author.pk).update(posts_count=42)
+        self.assertEqual(
+            self.paginator_count(StatsCount(AuthorStats, self.author.pk)), 42
+        )
+
+    def test_estimated_count_above_threshold(self):
+        """Выше порога используется оценка из sqlite_stat1."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute(
+                "UPDATE sqlite_stat1 SET stat = '5000000 1' "
+                "WHERE tbl = 'posts_post'"
+            )
+        self.assertEqual(
+            self.paginator_count(EstimatedCount(threshold=1000)), 5000000
+        )
+        self.assertEqual(
+            self.paginator_count(EstimatedCount(threshold=10 ** 9)), 5
+        )
+
+    def test_estimated_count_without_statistics(self):
+        """Без ANALYZE и для отфильтрованной ленты считается точно."""
+        self.assertEqual(self.paginator_count(EstimatedCount(threshold=1)), 5)
+        paginator = KeysetPaginator(
+            Post.objects.filter(author=self.author),
+            2,
+            EstimatedCount(threshold=1),
+        )
+        self.assertEqual(paginator.count, 5)
@@ -159,3 +159,37 @@ class PaginatorViewsTest(TestCase):
                     page_name, kwargs=kwarg) + '?page=2')
                 self.assertEqual(
                     len(response.context['page_obj']), POSTS_ON_SECOND_PAGE)
+
+    def test_keyset_pages_follow_cursors(self):
+        """Курсоры ?after= и ?before= листают ленту без OFFSET."""
+        POSTS_ON_SECOND_PAGE = (
+            self.AMOUNT_OF_TEST_POSTS - settings.POSTS_PER_PAGE
+        )
+        for page_name, kwarg in self.page_names_records.items():
+            with self.subTest(page_name=page_name):
+                url = reverse(page_name, kwargs=kwarg)
+                first_page = self.client.get(url).context['page_obj']
+                self.assertTrue(first_page.has_next())
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), POSTS_ON_SECOND_PAGE)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+                back_page = self.client.get(
+                    url, {'before': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    list(back_page.object_list),
+                    list(first_page.object_list)
+                )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'after': 'не-курсор'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), settings.POSTS_PER_PAGE)
+        self.assertFalse(page_obj.has_previous())
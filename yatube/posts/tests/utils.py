@@ -0,0 +1,11 @@
+from core.middleware.query_budget import check_query_budget, record_queries
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов страницы для TestCase."""
+
+    def assertWithinQueryBudget(self, client, url, data=None, method='get'):
+        with record_queries() as queries:
+            response = getattr(client, method)(url, data)
+        check_query_budget(response.resolver_match.view_name, queries)
+        return response
@@ -0,0 +1,223 @@
+from heapq import merge
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import (EXCERPT_PARAMS, EXCERPT_SELECT, LIST_FIELDS,
+                     AuthorStats, FanoutTask, Follow, Post, TimelineEntry)
+from .utils import KeysetPage, decode_cursor, encode_cursor
+
+# Записи ленты читаются вместе с полями карточки поста
+ENTRY_FIELDS = ('pub_date', 'post', *(f'post__{f}' for f in LIST_FIELDS))
+
+
+def author_state(author_id):
+    """Число подписчиков автора и признак знаменитости."""
+    return AuthorStats.objects.filter(pk=author_id).values_list(
+        'followers_count', 'celebrity'
+    ).first() or (0, False)
+
+
+def is_celebrity(author_id):
+    return author_state(author_id)[1]
+
+
+def follower_added(author_id):
+    AuthorStats.objects.filter(
+        pk=author_id,
+        celebrity=False,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+    ).update(celebrity=True)
+
+
+def follower_removed(author_id):
+    """Знаменитость, потерявшая подписчиков ниже
+    TIMELINE_CELEBRITY_EXIT_FOLLOWERS, снова раскладывает посты. Ее
+    последние посты не раскладывались, без раскладки они пропали бы из
+    лент подписчиков вместе с подмешиванием."""
+    if AuthorStats.objects.filter(
+        pk=author_id,
+        celebrity=True,
+        followers_count__lt=settings.TIMELINE_CELEBRITY_EXIT_FOLLOWERS,
+    ).update(celebrity=False):
+        schedule_fan_out(author_id)
+
+
+def schedule_fan_out(author_id):
+    """Последние посты автора раскладывает fanout_timelines."""
+    pks = Post.objects.filter(author=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', flat=True)[:settings.TIMELINE_BACKFILL]
+    FanoutTask.objects.bulk_create(
+        [FanoutTask(post_id=pk) for pk in pks], ignore_conflicts=True
+    )
+
+
+def follower_ids(author_id, after=0, limit=None):
+    ids = Follow.objects.filter(
+        author=author_id, user__gt=after
+    ).order_by('user_id').values_list('user_id', flat=True)
+    return list(ids[:limit] if limit else ids)
+
+
+def add_entries(post, user_ids):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id, post_id=post.pk,
+                author_id=post.author_id, pub_date=post.pub_date,
+            )
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора: сразу,
+    отложенной задачей или никак, если ленты подмешивают автора сами."""
+    followers, celebrity = author_state(post.author_id)
+    if not followers or celebrity:
+        return
+    if followers > settings.TIMELINE_INLINE_FANOUT:
+        FanoutTask.objects.create(post=post)
+        return
+    add_entries(post, follower_ids(post.author_id))
+
+
+def fan_out_batch(task, batch_size):
+    """Раскладывает пост следующей пачке подписчиков в своей транзакции.
+    Возвращает False, когда подписчики кончились и задача удалена."""
+    user_ids = follower_ids(task.post.author_id, task.cursor, batch_size)
+    with transaction.atomic():
+        add_entries(task.post, user_ids)
+        if len(user_ids) < batch_size:
+            task.delete()
+            return False
+        task.cursor = user_ids[-1]
+        task.save(update_fields=['cursor'])
+    return True
+
+
+def backfill_timeline(user, author):
+    """Последние посты автора в ленту нового подписчика."""
+    if is_celebrity(author.pk):
+        return
+    posts = Post.objects.filter(author=author).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user=user, post_id=pk, author=author, pub_date=pub_date
+            )
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def drop_from_timeline(user, author):
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+class TimelinePaginator(Paginator):
+    """Keyset-пагинация ленты подписок по (pub_date, id) поста.
+
+    Лента — это записи TimelineEntry читателя, к которым подмешиваются
+    посты знаменитостей из его подписок: их посты не раскладываются.
+    """
+
+    encode_cursor = staticmethod(encode_cursor)
+
+    def __init__(self, user, per_page, **kwargs):
+        super().__init__([], per_page, **kwargs)
+        self.user = user
+
+    @cached_property
+    def celebrity_ids(self):
+        return list(Follow.objects.filter(
+            user=self.user, author__post_stats__celebrity=True
+        ).values_list('author_id', flat=True))
+
+    @cached_property
+    def count(self):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if not self.celebrity_ids:
+            return entries.count()
+        return Post.objects.filter(
+            Q(author__in=self.celebrity_ids)
+            | Q(pk__in=entries.values('post_id'))
+        ).count()
+
+    def sources(self):
+        """Запросы частей ленты и имя поля с id поста в каждом."""
+        entries = TimelineEntry.objects.filter(
+            user=self.user
+        ).select_related(
+            'post__author', 'post__group', 'post__image'
+        ).only(
+            *ENTRY_FIELDS
+        ).extra(select=EXCERPT_SELECT, select_params=EXCERPT_PARAMS)
+        sources = [(entries, 'post_id')]
+        if self.celebrity_ids:
+            sources.append((
+                Post.objects.for_list().filter(
+                    author__in=self.celebrity_ids
+                ),
+                'pk',
+            ))
+        return sources
+
+    @staticmethod
+    def as_post(row):
+        if isinstance(row, TimelineEntry):
+            row.post.text_start = row.text_start
+            return row.post
+        return row
+
+    def fetch(self, cursor=None, newer=False):
+        """До per_page + 1 постов старше курсора или новее него."""
+        lookup, sign = ('gt', '') if newer else ('lt', '-')
+        parts = []
+        for rows, key in self.sources():
+            if cursor is not None:
+                pub_date, pk = cursor
+                rows = rows.filter(
+                    Q(**{f'pub_date__{lookup}': pub_date})
+                    | Q(pub_date=pub_date, **{f'{key}__{lookup}': pk})
+                )
+            rows = rows.order_by(f'{sign}pub_date', f'{sign}{key}')
+            parts.append([self.as_post(row) for row in rows[
+                :self.per_page + 1
+            ]])
+        posts = {}
+        for post in merge(
+            *parts, key=lambda post: (post.pub_date, post.pk),
+            reverse=not newer,
+        ):
+            # Пост знаменитости мог попасть в ленту, пока она ею не была
+            posts.setdefault(post.pk, post)
+            if len(posts) > self.per_page:
+                break
+        return list(posts.values())
+
+    def get_keyset_page(self, after=None, before=None):
+        cursor = decode_cursor(before) if before else None
+        if cursor is not None:
+            rows = self.fetch(cursor, newer=True)
+            if rows:
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return KeysetPage(rows, self, True, has_previous)
+        cursor = decode_cursor(after) if after else None
+        rows = self.fetch(cursor)
+        return KeysetPage(
+            rows[:self.per_page],
+            self,
+            len(rows) > self.per_page,
+            cursor is not None,
+        )
@@ -1,9 +1,228 @@
-from django.core.paginator import Paginator
+import base64
+import hashlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
 from yatube.settings import POSTS_PER_PAGE
 
+KEYSET_ORDERING = ('-pub_date', '-pk')
+
+
+def encode_token(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Части непрозрачного курсора или None, если курсор испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return raw.decode().split('|')
+    except ValueError:
+        return None
+
+
+def encode_cursor(post):
+    return encode_token(post.pub_date.isoformat(), post.pk)
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, pk) или None, если курсор испорчен."""
+    try:
+        pub_date, pk = decode_token(token)
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class KeysetPage(Page):
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0])
+        return None
+
+
+def exact_count(posts):
+    return posts.count()
+
+
+class CachedCount:
+    """Точный COUNT(*), закэшированный на timeout секунд."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def __call__(self, posts):
+        key = 'paginator:count:' + hashlib.md5(
+            str(posts.query).encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = posts.count()
+            timeout = self.timeout
+            if timeout is None:
+                timeout = settings.PAGINATOR_COUNT_CACHE_TIMEOUT
+            cache.set(key, count, timeout)
+        return count
 
-def paginate_page(request, posts):
-    paginator = Paginator(posts, POSTS_PER_PAGE)
+
+class StatsCount:
+    """Счетчик из AuthorStats или GroupStats, который ведут сигналы."""
+
+    def __init__(self, stats_model, pk):
+        self.stats_model = stats_model
+        self.pk = pk
+
+    def __call__(self, posts):
+        return self.stats_model.objects.posts_count(self.pk)
+
+
+def sqlite_row_estimate(using, table):
+    """Число строк таблицы по sqlite_stat1 или None без ANALYZE."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    if not rows:
+        return None
+    return max(int(stat.split()[0]) for stat, in rows)
+
+
+class EstimatedCount:
+    """Оценка по sqlite_stat1 для всей таблицы выше порога.
+
+    Оценка есть только для ленты без фильтров, остальные запросы
+    и маленькие таблицы считает fallback.
+    """
+
+    def __init__(self, threshold=None, fallback=exact_count):
+        self.threshold = threshold
+        self.fallback = fallback
+
+    def __call__(self, posts):
+        threshold = self.threshold
+        if threshold is None:
+            threshold = settings.PAGINATOR_ESTIMATE_THRESHOLD
+        if not posts.query.where:
+            estimate = sqlite_row_estimate(
+                posts.db, posts.model._meta.db_table
+            )
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return self.fallback(posts)
+
+
+class CountingPaginator(Paginator):
+    def __init__(self, object_list, per_page, count_strategy=exact_count,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy
+
+    @cached_property
+    def count(self):
+        return self.count_strategy(self.object_list)
+
+
+class KeysetPaginator(CountingPaginator):
+    """Пагинация поиском по (pub_date, id) вместо OFFSET и COUNT(*)."""
+
+    encode_cursor = staticmethod(encode_cursor)
+
+    def __init__(self, object_list, per_page, *args, **kwargs):
+        super().__init__(
+            object_list.order_by(*KEYSET_ORDERING), per_page, *args, **kwargs
+        )
+
+    def get_keyset_page(self, after=None, before=None):
+        cursor = decode_cursor(before) if before else None
+        if cursor is not None:
+            pub_date, pk = cursor
+            rows = list(self.object_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).order_by('pub_date', 'pk')[:self.per_page + 1])
+            if rows:
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return KeysetPage(rows, self, True, has_previous)
+        posts = self.object_list
+        cursor = decode_cursor(after) if after else None
+        if cursor is not None:
+            pub_date, pk = cursor
+            posts = posts.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        rows = list(posts[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page],
+            self,
+            len(rows) > self.per_page,
+            cursor is not None,
+        )
+
+
+def paginate_page(request, posts, count_strategy=exact_count):
+    paginator = KeysetPaginator(posts, POSTS_PER_PAGE, count_strategy)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    return paginator.get_keyset_page(
+        request.GET.get('after'), request.GET.get('before')
+    )
+
+
+@contextmanager
+def preserve_auto_dates(model):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из импорта."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
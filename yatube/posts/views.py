@@ -1,14 +1,33 @@
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+from django.views.decorators.vary import vary_on_cookie
 
-from .forms import PostForm
-from .models import Group, Post, User
-from .utils import paginate_page
+from core.db import retrying_atomic
+from yatube.settings import GROUPS_PER_PAGE, POSTS_PER_PAGE
+from .cache import (cache_feed, group_generations, index_generations,
+                    profile_generations)
+from .conditional import feed_condition, post_condition
+from .export import CONTENT_TYPES, export_chunks
+from .forms import PostForm, PostImageForm
+from .images import attach_image, store_image
+from .models import AuthorStats, Follow, Group, GroupStats, Post, User
+from .search import SearchPaginator, build_match_query
+from .timeline import (TimelinePaginator, backfill_timeline,
+                       drop_from_timeline, fan_out)
+from .utils import (CachedCount, EstimatedCount, StatsCount,
+                    paginate_page)
 
 
+@cache_feed(index_generations)
 def index(request):
-    posts = Post.objects.select_related('group', 'author').all()
-    page_obj = paginate_page(request, posts)
+    posts = Post.objects.for_list()
+    page_obj = paginate_page(
+        request, posts, EstimatedCount(fallback=CachedCount())
+    )
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
@@ -16,10 +35,30 @@ def index(request):
     return render(request, template, context)
 
 
+@cache_feed(index_generations)
+def group_index(request):
+    # Статистику групп меняет любая запись поста, как и главную ленту
+    stats = GroupStats.objects.select_related('group').order_by(
+        '-activity', 'pk'
+    )
+    paginator = Paginator(stats, GROUPS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    template = 'posts/group_index.html'
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@vary_on_cookie
+@feed_condition(group_generations)
+@cache_feed(group_generations)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group')
-    page_obj = paginate_page(request, posts)
+    posts = group.posts.for_list()
+    page_obj = paginate_page(
+        request, posts, StatsCount(GroupStats, group.pk)
+    )
     template = 'posts/group_list.html'
     context = {
         'group': group,
@@ -28,36 +67,112 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@vary_on_cookie
+@feed_condition(profile_generations)
+@cache_feed(profile_generations)
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('author')
-    page_obj = paginate_page(request, posts)
+    posts = author.posts.for_list()
+    page_obj = paginate_page(
+        request, posts, StatsCount(AuthorStats, author.pk)
+    )
+    following = (
+        request.user.is_authenticated and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'author': author,
+        'posts_count': page_obj.paginator.count,
         'page_obj': page_obj,
+        'following': following,
     }
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        raise PermissionDenied
+    data_format = request.GET.get('format', 'jsonl')
+    if data_format not in CONTENT_TYPES:
+        data_format = 'jsonl'
+    compress = 'gzip' in request.GET
+    filename = f'{author.username}_posts.{data_format}'
+    content_type = CONTENT_TYPES[data_format]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export_chunks(author.posts.all(), data_format, compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@vary_on_cookie
+@post_condition
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group', 'image'), pk=post_id
+    )
     context = {
         'post': post,
+        'posts_count': AuthorStats.objects.posts_count(post.author_id),
     }
     return render(request, template, context)
 
 
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    match = build_match_query(query)
+    page_obj = None
+    if match:
+        page_obj = SearchPaginator(match, POSTS_PER_PAGE).get_keyset_page(
+            request.GET.get('after'), request.GET.get('before')
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+def uploaded_image(image_form):
+    image = image_form.cleaned_data['image']
+    return store_image(image) if image else None
+
+
+@retrying_atomic
+def save_post(form, image_name, author=None):
+    """Записи поста одной транзакцией. Файл картинки уже сохранен, а
+    страница рисуется после: при повторе транзакции они не повторяются."""
+    post = form.save(commit=False)
+    created = author is not None
+    if created:
+        post.author = author
+    post.save()
+    if image_name:
+        attach_image(post, image_name)
+    if created:
+        fan_out(post)
+    return post
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None)
-    context = {'form': form}
-    if form.is_valid():
-        temp_post = form.save(commit=False)
-        temp_post.author = request.user
-        temp_post.save()
+    image_form = PostImageForm(request.POST or None, request.FILES or None)
+    context = {'form': form, 'image_form': image_form}
+    if form.is_valid() and image_form.is_valid():
+        temp_post = save_post(
+            form, uploaded_image(image_form), author=request.user
+        )
         return redirect(
             'posts:profile', temp_post.author
         )
@@ -67,12 +182,53 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
     form = PostForm(request.POST or None, instance=post)
-    if form.is_valid():
-        form.save()
+    image_form = PostImageForm(request.POST or None, request.FILES or None)
+    if form.is_valid() and image_form.is_valid():
+        save_post(form, uploaded_image(image_form))
         return redirect('posts:post_detail', post_id)
-    context = {'form': form, 'is_edit': True, 'post': post}
+    context = {
+        'form': form, 'image_form': image_form, 'is_edit': True, 'post': post
+    }
+    return render(request, template, context)
+
+
+@login_required
+def follow_index(request):
+    template = 'posts/follow.html'
+    page_obj = TimelinePaginator(
+        request.user, POSTS_PER_PAGE
+    ).get_keyset_page(request.GET.get('after'), request.GET.get('before'))
+    context = {
+        'page_obj': page_obj,
+    }
     return render(request, template, context)
+
+
+@login_required
+@require_POST
+@retrying_atomic
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        _, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        if created:
+            backfill_timeline(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+@retrying_atomic
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    drop_from_timeline(request.user, author)
+    return redirect('posts:profile', username)
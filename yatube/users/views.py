@@ -1,9 +1,12 @@
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView
 
+from core.db import retrying_atomic
 from .forms import CreationForm
 
 
+@method_decorator(retrying_atomic, name='post')
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -24,9 +25,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.server_timing.ServerTimingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.slow_queries.SlowQueryMiddleware',
+    'core.middleware.query_budget.QueryBudgetMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,7 +48,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,9 +70,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Реплики только для чтения, например локальная копия базы:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': 'file:' + os.path.join(BASE_DIR, 'replica.sqlite3') + '?mode=ro',
+# }
+# REPLICA_DATABASES = ['replica']
+REPLICA_DATABASES = []
+
+# Представления из этих модулей читают с реплик
+REPLICA_VIEW_MODULES = ('posts.views',)
+
+# Сколько секунд после записи пользователь читает с основной базы,
+# должно быть больше отставания реплик
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+# Через сколько секунд снова пробовать недоступную реплику
+REPLICA_RETRY_INTERVAL = 30
+
+# Применяются к каждому новому соединению, см. core.db.configure_sqlite.
+# WAL не блокирует читателей на время записи, synchronous=NORMAL
+# в режиме WAL сбрасывает данные на диск только при checkpoint.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Повторы пишущих транзакций, которым SQLite ответил database is locked
+DB_WRITE_RETRY_ATTEMPTS = 5
+DB_WRITE_RETRY_DELAY = 0.05
+DB_WRITE_RETRY_MAX_DELAY = 1
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -94,14 +140,161 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов (ширина, высота) для шаблонов: их заранее
+# строит make_thumbnails, при показе файлы не читаются
+POST_THUMBNAIL_SIZES = {
+    'card': (960, 339),
+    'detail': (960, 540),
+}
+
+POST_THUMBNAIL_QUALITY = 85
+
 POSTS_PER_PAGE = 10
 
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+# Выше этого числа строк пагинатор берет оценку из sqlite_stat1
+PAGINATOR_ESTIMATE_THRESHOLD = 100000
+
+# За столько дней вклад поста в рейтинг активности группы падает вдвое.
+# После изменения рейтинг пересчитывает rebuild_post_counters. Веса
+# хранятся без затухания и переполняют float примерно через тысячу
+# сроков после posts.models.ACTIVITY_EPOCH.
+GROUP_ACTIVITY_HALF_LIFE = 30
+
+GROUPS_PER_PAGE = 30
+
+# Пост автора, у которого подписчиков не больше этого числа,
+# раскладывается по их лентам в том же запросе. Остальные посты
+# раскладывает fanout_timelines пачками по TIMELINE_FANOUT_BATCH_SIZE.
+TIMELINE_INLINE_FANOUT = 500
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+
+# Посты авторов с таким числом подписчиков не раскладываются,
+# лента подписок подмешивает их при чтении. Обратно автор переходит
+# к раскладке, только потеряв подписчиков ниже второго порога: у первого
+# порога он не переключается туда-обратно при каждой подписке.
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+TIMELINE_CELEBRITY_EXIT_FOLLOWERS = 8000
+
+# Сколько последних постов автора попадает в ленту при подписке
+TIMELINE_BACKFILL = 50
+
+# Поколения лент и страницы по ним должны быть общими для всех процессов
+# сервера: иначе после записи в одном процессе другой отдает старую
+# страницу. Кэш в памяти процесса годится только для одного процесса,
+# см. проверку core.W001.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.InstrumentedFileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
+# Страницы лент живут в кэше до смены поколения ленты
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Ключ карточки поста включает время изменения поста
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Бюджеты SQL-запросов на одну страницу, проверяются в режиме отладки
+QUERY_BUDGET_ENFORCE = DEBUG
+
+QUERY_BUDGET_DEFAULT = None
+
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:profile_export': 3,
+    'posts:post_detail': 5,
+    'posts:search': 4,
+    'posts:post_create': 12,
+    'posts:post_edit': 12,
+    'posts:group_index': 3,
+    'posts:follow_index': 5,
+    'posts:profile_follow': 14,
+    'posts:profile_unfollow': 11,
+    'api:index': 1,
+    'api:group_list': 2,
+    'api:profile': 2,
+    'api:post_detail': 2,
+}
+
+# Заголовок Server-Timing и лог yatube.timing для каждого запроса
+SERVER_TIMING_ENABLED = True
+
+# Метрики Prometheus: каждый процесс пишет свой файл в METRICS_DIR,
+# /metrics их суммирует. Каталог стоит очищать при развертывании.
+METRICS_ENABLED = True
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Регистраторы медленных запросов и повторов с одинаковым отпечатком,
+# пустой список отключает SlowQueryMiddleware
+SLOW_QUERY_RECORDERS = ['core.slow_queries.LoggingRecorder']
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_REPEAT_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.logging.JsonFormatter'},
+    },
+    'handlers': {
+        'json_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        # В режиме отладки записи о каждом запросе не выводятся
+        'yatube.timing': {
+            'handlers': ['json_console'],
+            'level': 'WARNING' if DEBUG else 'INFO',
+            'propagate': False,
+        },
+        'yatube.slow_queries': {
+            'handlers': ['json_console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Запрос только ставит письмо в очередь, доставляет его send_outbox
+EMAIL_BACKEND = 'core.mail_backends.OutboxEmailBackend'
+
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+OUTBOX_BATCH_SIZE = 100
+
+# Пауза команды send_outbox --loop между проверками пустой очереди
+OUTBOX_POLL_INTERVAL = 5
+
+# Повторы недоставленных писем: пауза удваивается от попытки к попытке
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 30
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+
+# Сколько секунд забранная пачка скрыта от других обработчиков
+OUTBOX_LEASE_SECONDS = 5 * 60
+
+# Точно такое же письмо за это время второй раз не ставится в очередь
+OUTBOX_DEDUP_SECONDS = 5 * 60
+
+OUTBOX_KEEP_SENT = 24 * 60 * 60